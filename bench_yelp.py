@@ -0,0 +1,497 @@
+# -*- coding: utf-8 -*-
+"""
+Consulted:
+Date: 2026.10.18
+Purpose: Benchmarks for the Yelp task functions. Generates deterministic
+    synthetic Yelp data of any size (the bundled sample files top out
+    at a few hundred businesses) shaped like the real data, and times
+    loadData and the query functions in yelp.py against it, recording
+    throughput and peak memory so that runs can be compared.
+
+Usage:
+    python bench_yelp.py suite [--sizes N ...] [--output FILE]
+                               [--compare OLD_FILE] [--no-memory]
+    python bench_yelp.py cities [maxSize]
+    python bench_yelp.py intern
+    python bench_yelp.py differences [--baseline OLD_OPTIMISM.py]
+"""
+
+#---------#
+# Imports #
+#---------#
+
+import argparse
+import copy
+import datetime
+import importlib.util
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import optimism
+import yelp
+
+#-----------#
+# Constants #
+#-----------#
+
+SAMPLE_FILE = 'miniYelp.json'
+"""
+Bundled sample file used as the smallest benchmark size, and as the
+source of the value distributions the synthetic generator copies.
+"""
+
+BUNDLED_FILES = [
+    'soloYelp.json', 'pizzaYelp.json', 'microYelp.json', 'miniYelp.json'
+]
+"""
+All of the sample data files that come with the task.
+"""
+
+STATES = ['AZ', 'NV', 'ON', 'NC', 'OH', 'PA', 'QC', 'WI', 'IL', 'SC']
+"""
+State codes given to made-up cities by the synthetic generator.
+"""
+
+CHAIN_SHARE = 0.1
+"""
+Fraction of synthetic businesses that are part of a chain, and so share
+their name with many others (the rest get unique names).
+"""
+
+SUITE_SIZES = [1000, 10000, 100000]
+"""
+Data set sizes the suite runs by default. Larger sizes (up to 10 million
+businesses or so, memory permitting) can be given with --sizes.
+"""
+
+REGRESSION_RATIO = 1.2
+"""
+How many times slower than an earlier run a benchmark has to be before
+--compare reports it as a regression.
+"""
+
+#---------------------#
+# Synthetic Yelp data #
+#---------------------#
+
+def _cumulative(counts, extra=0, label=None):
+    '''returns the values of a Counter, most common first, and their
+cumulative weights (precomputed, since random.choices would otherwise
+redo that work on every call). If extra is given, that many made-up
+values named after label are added, with weights falling off as 1/rank
+after the least common real value, giving a long heavy tail.'''
+    ranked = counts.most_common()
+    values = [value for value, _ in ranked]
+    weights = [count for _, count in ranked]
+    start = len(values)
+    for i in range(extra):
+        values.append(f'{label} {i}')
+        weights.append(weights[-1] * (start + i) / (start + i + 1))
+    return values, list(itertools.accumulate(weights))
+
+def syntheticBusinesses(size, seed=0):
+    '''yields size (bizID, business) pairs drawn from a fixed random seed,
+so the same arguments always give the same data. Cities, categories,
+star ratings, the number of categories per business and chain names
+follow their proportions in the sample file; bigger sizes add a long
+tail of made-up cities and categories (about sqrt(size) cities and
+size**0.4 categories in all), so the most common ones (Las Vegas,
+Restaurants) stay dominant as in the real data.'''
+    rng = random.Random(seed)
+    sample = yelp.loadData(SAMPLE_FILE).values()
+    cityCounts = Counter(bus['city'] for bus in sample)
+    states = {bus['city']: bus['state'] for bus in sample}
+    cities, cityWeights = _cumulative(
+        cityCounts,
+        max(0, int(size ** 0.5) - len(cityCounts)),
+        'City'
+    )
+    for i, city in enumerate(cities[len(cityCounts):]):
+        states[city] = STATES[i % len(STATES)]
+    categoryCounts = Counter(
+        category for bus in sample for category in bus['categories']
+    )
+    categories, categoryWeights = _cumulative(
+        categoryCounts,
+        max(0, int(size ** 0.4) - len(categoryCounts)),
+        'Category'
+    )
+    stars, starWeights = _cumulative(Counter(bus['stars'] for bus in sample))
+    lengths, lengthWeights = _cumulative(
+        Counter(len(bus['categories']) for bus in sample)
+    )
+    nameCounts = Counter(bus['name'] for bus in sample)
+    chains = sorted(name for name, count in nameCounts.items() if count > 1)
+
+    for i in range(size):
+        city = rng.choices(cities, cum_weights=cityWeights)[0]
+        if rng.random() < CHAIN_SHARE:
+            name = rng.choice(chains)
+        else:
+            name = f'Business {i}'
+        categoryCount = rng.choices(lengths, cum_weights=lengthWeights)[0]
+        yield f'biz{i:019d}', {
+            'state': states[city],
+            'address': f'{rng.randrange(1, 10000)} Main St',
+            'review_count': int(rng.paretovariate(1.2) * 3),
+            'stars': rng.choices(stars, cum_weights=starWeights)[0],
+            'name': name,
+            'city': city,
+            'categories': list(dict.fromkeys(rng.choices(
+                categories,
+                cum_weights=categoryWeights,
+                k=categoryCount
+            ))),
+        }
+
+def syntheticYelp(size, seed=0):
+    '''returns a Yelp dictionary of size synthetic businesses'''
+    return dict(syntheticBusinesses(size, seed))
+
+def writeSynthetic(filename, size, seed=0):
+    '''writes size synthetic businesses to filename, laid out like the
+bundled data files, without ever holding them all in memory'''
+    with open(filename, 'w') as f:
+        f.write('{')
+        separator = '\n'
+        for bizID, bus in syntheticBusinesses(size, seed):
+            f.write(f'{separator}  {json.dumps(bizID)}: {json.dumps(bus)}')
+            separator = ',\n'
+        f.write('\n}\n')
+
+#------------#
+# Benchmarks #
+#------------#
+
+def bestTime(function, *args, repeat=3):
+    '''returns the fastest of several timings of function(*args), in seconds'''
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def peakMemory(function, *args):
+    '''returns the most memory, in bytes, allocated at once while running
+function(*args), as measured by tracemalloc. Tracing slows everything
+down, so this is kept separate from timing.'''
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def suiteCases(yelpDict, outFilename):
+    '''returns a (name, function) pair for each query function, with
+arguments chosen to be typical of yelpDict: the most common business
+name, city and category'''
+    name = Counter(bus['name'] for bus in yelpDict.values()).most_common(1)
+    city = Counter(bus['city'] for bus in yelpDict.values()).most_common(1)
+    categories = yelp.findCategories(yelpDict, 0)
+    category = max(categories, key=categories.get)
+    threshold = max(1, len(yelpDict) // 100)
+    return [
+        ('getBusinessCount',
+         lambda: yelp.getBusinessCount(yelpDict, name[0][0])),
+        ('uniqueCities', lambda: yelp.uniqueCities(yelpDict)),
+        ('findBusinesses', lambda: yelp.findBusinesses(
+            yelpDict, category, city[0][0], 3.5, 10, outFilename
+        )),
+        ('findCategories', lambda: yelp.findCategories(yelpDict, threshold)),
+        ('bestPizzaPlace', lambda: yelp.bestPizzaPlace(yelpDict)),
+    ]
+
+def runSuite(sizes=SUITE_SIZES, seed=0, repeat=3, memory=True, workDir=None):
+    '''times loadData and every query function on a synthetic data set of
+each size, printing a table as it goes, and returns the results as a
+JSON-ready dictionary. Data files are written to workDir (a temporary
+directory by default) and reused if they are already there.'''
+    if workDir is None:
+        workDir = tempfile.mkdtemp(prefix='bench_yelp_')
+    outFilename = os.path.join(workDir, 'findBusinesses.json')
+    results = []
+    print(f"{'businesses':>10} {'function':<18} {'seconds':>10}"
+          f" {'businesses/s':>14} {'peak MiB':>9}")
+    for size in sizes:
+        dataFile = os.path.join(workDir, f'synthetic-{size}-{seed}.json')
+        if not os.path.exists(dataFile):
+            writeSynthetic(dataFile, size, seed)
+        yelpDict = yelp.loadData(dataFile)
+        cases = [('loadData', lambda: yelp.loadData(dataFile))]
+        cases += suiteCases(yelpDict, outFilename)
+        for name, function in cases:
+            seconds = bestTime(function, repeat=repeat)
+            peakBytes = peakMemory(function) if memory else None
+            results.append({
+                'size': size,
+                'function': name,
+                'seconds': seconds,
+                'throughput': size / seconds,
+                'peakBytes': peakBytes,
+            })
+            if peakBytes is None:
+                peak = ''
+            else:
+                peak = f'{peakBytes / 2 ** 20:.2f}'
+            print(f"{size:>10} {name:<18} {seconds:>10.4f}"
+                  f" {size / seconds:>14.0f} {peak:>9}")
+        del yelpDict
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+def compareResults(old, new, ratio=REGRESSION_RATIO):
+    '''prints how long each benchmark in the new results took compared with
+the same benchmark (same size and function) in the old results, marking
+ones at least ratio times slower, and returns how many were marked'''
+    before = {
+        (result['size'], result['function']): result['seconds']
+        for result in old['results']
+    }
+    regressions = 0
+    print(f"{'businesses':>10} {'function':<18} {'old s':>10} {'new s':>10}"
+          f" {'change':>8}")
+    for result in new['results']:
+        key = (result['size'], result['function'])
+        if key not in before:
+            continue
+        change = result['seconds'] / before[key]
+        marker = ''
+        if change >= ratio:
+            marker = '  REGRESSION'
+            regressions += 1
+        print(f"{result['size']:>10} {result['function']:<18}"
+              f" {before[key]:>10.4f} {result['seconds']:>10.4f}"
+              f" {change:>7.2f}x{marker}")
+    return regressions
+
+def benchUniqueCities(maxSize=1000000):
+    '''times uniqueCities on the bundled sample file and then on synthetic
+data sets growing by factors of ten up to maxSize businesses, printing
+time per business so that (near-)linear scaling is easy to see'''
+    datasets = [(SAMPLE_FILE, yelp.loadData(SAMPLE_FILE))]
+    size = 1000
+    while size <= maxSize:
+        datasets.append((f'synthetic-{size}', syntheticYelp(size)))
+        size *= 10
+
+    print(f"{'dataset':<20} {'businesses':>10} {'cities':>7}"
+          f" {'seconds':>10} {'ns/business':>12}")
+    for label, yelpDict in datasets:
+        elapsed = bestTime(yelp.uniqueCities, yelpDict)
+        cityCount = len(yelp.uniqueCities(yelpDict))
+        perBusiness = elapsed / len(yelpDict) * 1e9
+        print(f"{label:<20} {len(yelpDict):>10} {cityCount:>7}"
+              f" {elapsed:>10.4f} {perBusiness:>12.1f}")
+
+def deepSize(obj):
+    '''returns the total size in bytes of obj and every distinct object
+reachable from it through dictionaries and lists; objects reachable
+several ways (such as interned strings) are only counted once'''
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return total
+
+def reportInterning():
+    '''prints how much memory loadData's intern mode saves on each of the
+bundled sample files'''
+    print(f"{'file':<16} {'plain bytes':>12} {'interned bytes':>15}"
+          f" {'saved':>8}")
+    for filename in BUNDLED_FILES:
+        plain = deepSize(yelp.loadData(filename))
+        interned = deepSize(yelp.loadData(filename, intern=True))
+        saved = 1 - interned / plain
+        print(f"{filename:<16} {plain:>12} {interned:>15} {saved:>8.1%}")
+
+def nestedLists(depth, leaf):
+    '''returns lists nested depth deep, each holding a 0 and the next list,
+with leaf at the bottom'''
+    top = current = []
+    for _ in range(depth):
+        inner = [0]
+        current.append(inner)
+        current = inner
+    current.append(leaf)
+    return top
+
+def differenceCases():
+    '''returns (label, value, reference) triples for benchmarking
+optimism.findFirstDifference: big Yelp structures with one changed leaf,
+floats that only differ within tolerance, and deeply nested lists'''
+    mini = yelp.loadData(SAMPLE_FILE)
+    miniChanged = copy.deepcopy(mini)
+    last = list(miniChanged)[-1]
+    miniChanged[last]['categories'][-1] += '!'
+
+    big = syntheticYelp(20000)
+    bigChanged = copy.deepcopy(big)
+    last = list(bigChanged)[-1]
+    bigChanged[last]['stars'] += 1
+
+    floats = [float(i) for i in range(200000)]
+    closeFloats = [x * (1 + 1e-12) for x in floats]
+
+    cases = [
+        (f'{SAMPLE_FILE}, one leaf', miniChanged, mini),
+        ('20000 businesses, one leaf', bigChanged, big),
+        ('20000-item list, last item', list(bigChanged.values()),
+         list(big.values())),
+        ('200000 floats within tolerance', closeFloats, floats),
+    ]
+    for depth in (500, 5000, 50000):
+        cases.append((
+            f'{depth}-deep lists, within tolerance',
+            nestedLists(depth, 1.0 + 1e-12),
+            nestedLists(depth, 1.0)
+        ))
+    return cases
+
+def loadModule(filename, name):
+    '''imports the Python file filename as a module with the given name'''
+    spec = importlib.util.spec_from_file_location(name, filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def benchDifferences(baseline=None):
+    '''times optimism.findFirstDifference on each of differenceCases, and
+also the findFirstDifference from the optimism.py file named baseline
+(such as an older version) if one is given'''
+    versions = [('optimism', optimism)]
+    if baseline is not None:
+        versions.append(('baseline', loadModule(baseline, 'baseline')))
+
+    header = f"{'case':<34}"
+    for label, _ in versions:
+        header += f" {label + ' ms':>13}"
+    print(header)
+    for label, value, reference in differenceCases():
+        line = f"{label:<34}"
+        for _, module in versions:
+            try:
+                seconds = bestTime(
+                    module.findFirstDifference,
+                    value,
+                    reference
+                )
+                line += f" {seconds * 1000:>13.2f}"
+            except RecursionError:
+                line += f" {'RecursionError':>13}"
+        print(line)
+
+#--------------#
+# Command line #
+#--------------#
+
+def main(argv=None):
+    '''runs one of the benchmarks from the command line, returning 1 if a
+comparison found regressions'''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    suiteParser = commands.add_parser(
+        'suite',
+        help='time loadData and each query at several data sizes'
+    )
+    suiteParser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        default=SUITE_SIZES,
+        help='numbers of businesses to generate'
+    )
+    suiteParser.add_argument('--seed', type=int, default=0)
+    suiteParser.add_argument('--repeat', type=int, default=3)
+    suiteParser.add_argument(
+        '--no-memory',
+        action='store_true',
+        help='skip measuring peak memory, which roughly doubles run time'
+    )
+    suiteParser.add_argument(
+        '--work-dir',
+        help='directory to keep generated data files in between runs'
+    )
+    suiteParser.add_argument(
+        '--output',
+        default='bench_results.json',
+        help='file to save the results to'
+    )
+    suiteParser.add_argument(
+        '--compare',
+        help='results file from an earlier run to check for regressions'
+    )
+    citiesParser = commands.add_parser(
+        'cities',
+        help='show how uniqueCities scales'
+    )
+    citiesParser.add_argument('maxSize', type=int, nargs='?', default=1000000)
+    commands.add_parser(
+        'intern',
+        help="show how much memory loadData's intern mode saves"
+    )
+    differencesParser = commands.add_parser(
+        'differences',
+        help='time optimism.findFirstDifference on large and deep values'
+    )
+    differencesParser.add_argument(
+        '--baseline',
+        help='another optimism.py to compare against'
+    )
+    options = parser.parse_args(argv)
+
+    if options.command == 'cities':
+        benchUniqueCities(options.maxSize)
+    elif options.command == 'intern':
+        reportInterning()
+    elif options.command == 'differences':
+        benchDifferences(options.baseline)
+    else:
+        report = runSuite(
+            options.sizes,
+            options.seed,
+            options.repeat,
+            not options.no_memory,
+            options.work_dir
+        )
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {options.output}")
+        if options.compare is not None:
+            with open(options.compare, 'r') as f:
+                old = json.load(f)
+            if compareResults(old, report) > 0:
+                return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
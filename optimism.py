@@ -169,11 +169,22 @@ TODO: Prevent crash if expr_src is unavailable when tracing...
   any extra '\\r' before a newline, so when that's on (the default) this
   shouldn't change much. A test of this behavior was added to the file
   test example.
+- Version 2.7.0 caches the source code and parsed AST of each file that
+  `expect`, `expectType`, and `trace` are called from (re-reading the
+  file only if its modification time or size changes), along with an
+  index of AST nodes by line number, so that suites with many checks in
+  one file don't re-parse that file for every check. Test cases also
+  now only build their location tags when a message needs them. The new
+  `runCasesInParallel` function can run function test cases in worker
+  processes before their checks are made. `findFirstDifference` is
+  much faster on large lists and dictionaries: it skips over runs of
+  equal items using slice comparisons and only builds reprs of whole
+  containers when a message uses them. It also no longer recurses, so it
+  can compare structures nested more deeply than Python's recursion
+  limit.
 """
 
-# TODO: Cache compiled ASTs!
-
-__version__ = "2.6.6"
+__version__ = "2.7.0"
 
 import sys
 import traceback
@@ -187,6 +198,9 @@ import types
 import builtins
 import cmath
 import textwrap
+import reprlib
+import concurrent.futures
+import multiprocessing
 
 
 #---------#
@@ -283,6 +297,14 @@ The absolute tolerance for floating-point similarity (see
 `cmath.isclose`).
 """
 
+SOURCE_CACHE = {}
+"""
+A dictionary mapping filenames to dictionaries holding the source code,
+parsed AST, and per-line AST node indices for that file, as returned by
+`get_source_info`. Entries are replaced when a file's modification time
+or size changes.
+"""
+
 
 #--------#
 # Errors #
@@ -335,9 +357,26 @@ class TestCase:
         # Whether to echo captured printed outputs (overrides global)
         self.echo = None
 
-        # Location and tag for test case creation
-        self.location = get_my_location()
-        self.tag = tag_for(self.location)
+        # Where this test case was created: the calling frame's
+        # __file__ global and code filename (the first is preferred, see
+        # `get_filename`), line number, and the detail level at the
+        # time. The `location` and `tag` properties are built from these
+        # only when a message needs them.
+        frame = get_external_calling_frame()
+        try:
+            self._origin = (
+                frame.f_globals.get("__file__"),
+                frame.f_code.co_filename,
+                frame.f_lineno,
+                DETAIL_LEVEL
+            )
+        finally:
+            del frame
+        self._location = None
+
+        # Output from a run in another process which should be echoed
+        # when the results are first fetched (see `runCasesInParallel`)
+        self._pending_echo = None
 
         # List of outcomes of checks that were made. Each is a triple
         # with a True/False indicator for success/failure, a string tag
@@ -350,6 +389,27 @@ class TestCase:
         # Register as a test case
         ALL_CASES.setdefault(_CURRENT_SUITE_NAME, []).append(self)
 
+    @property
+    def location(self):
+        """
+        A dictionary with "file" and "line" keys indicating where this
+        test case was created (see `get_my_location`).
+        """
+        if self._location is None:
+            file_global, co_filename, lineno, _ = self._origin
+            if file_global is None:
+                file_global = co_filename
+            self._location = { "file": file_global, "line": lineno }
+        return self._location
+
+    @property
+    def tag(self):
+        """
+        The tag for this test case, using the detail level that was in
+        effect when it was created (see `tag_for`).
+        """
+        return tag_for(self.location, self._origin[3])
+
     def provideInputs(self, *inputLines):
         """
         Sets up fake inputs (each argument must be a string and is used
@@ -399,65 +459,12 @@ class TestCase:
         In addition to being added to the results slot, this dictionary
         is also returned.
         """
-        # Set up the `input` function to echo what is typed
-        original_input = builtins.input
-
-        def echoing_input(prompt):
-            """
-            A stand-in for the built-in input which echoes the received
-            input to stdout, under the assumption that stdin will NOT be
-            echoed to the output stream because the output stream is not
-            the console any more.
-            """
-            nonlocal original_input
-            result = original_input(prompt)
-            sys.stdout.write(result + '\n')
-            return result
-
-        builtins.input = echoing_input
-
-        # Set up a capturing stream for output
-        outputCapture = CapturingStream()
-        outputCapture.install()
-        if self.echo or (self.echo is None and _SHOW_OUTPUT):
-            outputCapture.echo()
-
-        # Set up fake input contents
-        if self.inputs is not None:
-            fakeInput = io.StringIO('\n'.join(self.inputs))
-            original_stdin = sys.stdin
-            sys.stdin = fakeInput
-
-        # Set up default values before we run things
-        error = None
-        tb = None
-        value = NoResult
-
-        # Actually run the test
-        try:
-            value = payload()
-        except Exception as e:
-            # Catch any error that occurred
-            error = e
-            tb = traceback.format_exc()
-        finally:
-            # Release stream captures and reset the input function
-            outputCapture.uninstall()
-            builtins.input = original_input
-            if self.inputs is not None:
-                sys.stdin = original_stdin
-
-        # Grab captured output
-        output = outputCapture.getvalue()
-
-        # Create self.results w/ output, error, and maybe result value
-        self.results = {
-            "output": output,
-            "error": error,
-            "traceback": tb
-        }
-        if value is not NoResult:
-            self.results["result"] = value
+        self.results = run_with_capture(
+            payload,
+            self.inputs,
+            self.echo or (self.echo is None and _SHOW_OUTPUT)
+        )
+        self._pending_echo = None
 
         # Return new results object
         return self.results
@@ -489,6 +496,9 @@ class TestCase:
         """
         if self.results is None:
             self.run()
+        elif self._pending_echo is not None:
+            sys.stdout.write(self._pending_echo)
+            self._pending_echo = None
         return self.results
 
     def _create_success_message(
@@ -1839,6 +1849,77 @@ class CapturingStream(io.StringIO):
         super().write(stuff)
 
 
+def run_with_capture(payload, inputs=None, echo=False):
+    """
+    Runs the given payload (a zero-argument function) while capturing
+    printed output and, if inputs is not None, supplying those strings
+    as lines of fake input. If echo is True, captured output is also
+    printed as it happens. Returns a results dictionary as described in
+    `TestCase._run`.
+    """
+    # Set up the `input` function to echo what is typed
+    original_input = builtins.input
+
+    def echoing_input(prompt):
+        """
+        A stand-in for the built-in input which echoes the received
+        input to stdout, under the assumption that stdin will NOT be
+        echoed to the output stream because the output stream is not
+        the console any more.
+        """
+        nonlocal original_input
+        result = original_input(prompt)
+        sys.stdout.write(result + '\n')
+        return result
+
+    builtins.input = echoing_input
+
+    # Set up a capturing stream for output
+    outputCapture = CapturingStream()
+    outputCapture.install()
+    if echo:
+        outputCapture.echo()
+
+    # Set up fake input contents
+    if inputs is not None:
+        fakeInput = io.StringIO('\n'.join(inputs))
+        original_stdin = sys.stdin
+        sys.stdin = fakeInput
+
+    # Set up default values before we run things
+    error = None
+    tb = None
+    value = NoResult
+
+    # Actually run the test
+    try:
+        value = payload()
+    except Exception as e:
+        # Catch any error that occurred
+        error = e
+        tb = traceback.format_exc()
+    finally:
+        # Release stream captures and reset the input function
+        outputCapture.uninstall()
+        builtins.input = original_input
+        if inputs is not None:
+            sys.stdin = original_stdin
+
+    # Grab captured output
+    output = outputCapture.getvalue()
+
+    # Create results w/ output, error, and maybe result value
+    results = {
+        "output": output,
+        "error": error,
+        "traceback": tb
+    }
+    if value is not NoResult:
+        results["result"] = value
+
+    return results
+
+
 def showPrintedLines(show=True):
     """
     Changes the testing mechanisms so that printed output produced during
@@ -2041,6 +2122,18 @@ def ellipsis(string, maxlen=40):
         return string
 
 
+def deep_safe_repr(obj):
+    """
+    Returns repr(obj), unless obj is nested too deeply for that to work
+    without a RecursionError, in which case an abbreviated
+    representation from `reprlib.repr` is returned instead.
+    """
+    try:
+        return repr(obj)
+    except RecursionError:
+        return reprlib.repr(obj)
+
+
 def dual_string_repr(string):
     """
     Returns a pair containing full and truncated representations of the
@@ -2241,13 +2334,83 @@ def findFirstDifference(val, ref, comparing=None):
     numbers, including those found in complex structures.
 
     Works for recursive data structures; the `comparing` argument serves
-    as a memo to avoid infinite recursion, and the `within` argument
-    indicates where in a complex structure we are; both should normally
-    be left as their defaults.
+    as a memo to avoid infinite recursion, and should normally be left
+    as its default.
+
+    Nested structures are explored using an explicit stack of
+    `container_difference_steps` generators rather than by recursion,
+    so arbitrarily deep structures can be compared without running out
+    of Python stack space. `first_difference_step` handles each pair of
+    values.
     """
     if comparing is None:
         comparing = set()
 
+    stack = []
+    outcome = first_difference_step(val, ref, comparing)
+    error = None
+    # References to every pair compared, some of which (like sorted
+    # copies of sets) are temporary; keeping them alive stops their ids
+    # from being reused by later values while they're in the memo
+    compared = []
+    while True:
+        if isinstance(outcome, types.GeneratorType):
+            stack.append(outcome)
+            outcome = None
+        elif len(stack) == 0:
+            if error is not None:
+                raise error
+            return outcome
+
+        # Resume the innermost container comparison, giving it the
+        # outcome of the comparison it asked for (or raising the error
+        # that comparison raised, just as a recursive call would)
+        try:
+            if error is None:
+                pair = stack[-1].send(outcome)
+            else:
+                pair = stack[-1].throw(error)
+        except StopIteration as stop:
+            stack.pop()
+            outcome = stop.value
+            error = None
+            continue
+        except Exception as e:
+            stack.pop()
+            outcome = None
+            error = e
+            continue
+
+        # Start the comparison it asked for
+        compared.append(pair)
+        error = None
+        try:
+            outcome = first_difference_step(
+                pair[0],
+                pair[1],
+                comparing,
+                pair[2]
+            )
+        except Exception as e:
+            outcome = None
+            error = e
+
+
+def first_difference_step(val, ref, comparing, skip=0):
+    """
+    Does the work of `findFirstDifference` for one pair of values,
+    using comparing as the memo of (id, id) pairs already visited.
+    Returns a string describing the difference or None if there isn't
+    one, except for pairs of lists, tuples, sets, or dictionaries, where
+    it returns a generator from `container_difference_steps` instead.
+
+    Comparing very deep structures with == raises a RecursionError only
+    after doing a lot of work, and the same would happen again at each
+    level below. So when that happens, == isn't tried for containers in
+    the next `sys.getrecursionlimit() // 2` levels; skip is the number
+    of levels that remain (in which case items are just compared one by
+    one).
+    """
     cmpkey = (id(val), id(ref))
     if cmpkey in comparing:
         # Either they differ somewhere else, or they're functionally
@@ -2258,10 +2421,16 @@ def findFirstDifference(val, ref, comparing=None):
 
     comparing.add(cmpkey)
 
-    try:
-        simple = val == ref
-    except RecursionError:
+    if skip > 0 and isinstance(val, (list, tuple, set, dict)):
         simple = False
+        skip -= 1
+    else:
+        skip = 0
+        try:
+            simple = val == ref
+        except RecursionError:
+            simple = False
+            skip = sys.getrecursionlimit() // 2
 
     if simple:
         return None
@@ -2289,8 +2458,8 @@ def findFirstDifference(val, ref, comparing=None):
                     return f"numbers {val} and {ref} are different"
 
         elif type(val) != type(ref): # different types; not both numbers
-            svr = ellipsis(repr(val), 8)
-            srr = ellipsis(repr(ref), 8)
+            svr = ellipsis(deep_safe_repr(val), 8)
+            srr = ellipsis(deep_safe_repr(ref), 8)
             return (
                 f"values {svr} and {srr} have different types"
                 f" ({type(val)} and {type(ref)})"
@@ -2432,197 +2601,8 @@ def findFirstDifference(val, ref, comparing=None):
                             f" but expected {expected}"
                         )
 
-        elif isinstance(val, (list, tuple)): # both lists or tuples
-            svr = ellipsis(repr(val), 10)
-            srr = ellipsis(repr(ref), 10)
-            typ = type(val).__name__
-            if len(val) != len(ref):
-                return (
-                    f"{typ}s {svr} and {srr} have different lengths"
-                    f" ({len(val)} and {len(ref)})"
-                )
-            else:
-                for i in range(len(val)):
-                    diff = findFirstDifference(val[i], ref[i], comparing)
-                    if diff is not None:
-                        return f"in slot {i} of {typ}, " + diff
-                return None # no differences in any slot
-
-        elif isinstance(val, (set)): # both sets
-            svr = ellipsis(repr(val), 10)
-            srr = ellipsis(repr(ref), 10)
-            onlyVal = (val - ref)
-            onlyRef = (ref - val)
-            # Sort so we can match up different-but-equivalent
-            # floating-point items...
-            try:
-                sonlyVal = sorted(onlyVal)
-                sonlyRef = sorted(onlyRef)
-                diff = findFirstDifference(
-                    sonlyVal,
-                    sonlyRef,
-                    comparing
-                )
-            except TypeError:
-                # not sortable, so not just floating-point diffs
-                diff = "some"
-
-            if diff is None:
-                return None
-            else:
-                nMissing = len(onlyRef)
-                nExtra = len(onlyVal)
-                if nExtra == 0:
-                    firstMissing = ellipsis(repr(list(onlyRef)[0]), 12)
-                    result = f"in a set, missing element {firstMissing}"
-                    if nMissing > 1:
-                        result += f" ({nMissing} missing elements in total)"
-                    return result
-                elif nMissing == 0:
-                    firstExtra = ellipsis(repr(list(onlyVal)[0]), 12)
-                    return f"in a set, extra element {firstExtra}"
-                    if nExtra > 1:
-                        result += f" ({nExtra} extra elements in total)"
-                    return result
-                else:
-                    firstMissing = ellipsis(repr(list(onlyRef)[0]), 8)
-                    firstExtra = ellipsis(repr(list(onlyVal)[0]), 8)
-                    result = (
-                        "in a set, elements are different (extra"
-                        f" element {firstExtra} and missing element"
-                        f" {firstMissing}"
-                    )
-                    if nMissing > 1 and nExtra > 1:
-                        result += (
-                            f" ({nExtra} total extra elements and"
-                            f" {nMissing} total missing elements"
-                        )
-                    elif nMissing == 1:
-                        if nExtra > 1:
-                            result += (
-                                f" (1 missing and {nExtra} total extra"
-                                f" elements)"
-                            )
-                    else: # nExtra must be 1
-                        if nMissing > 1:
-                            result += (
-                                f" (1 extra and {nExtra} total missing"
-                                f" elements)"
-                            )
-                    return result
-
-        elif isinstance(val, dict): # both dicts
-            svr = ellipsis(repr(val), 14)
-            srr = ellipsis(repr(ref), 14)
-
-            if len(val) != len(ref):
-                if len(val) < len(ref):
-                    ldiff = len(ref) - len(val)
-                    firstMissing = ellipsis(
-                        repr(list(set(ref.keys()) - set(val.keys()))[0]),
-                        30
-                    )
-                    return (
-                        f"dictionary is missing key {firstMissing} (has"
-                        f" {ldiff} fewer key{'s' if ldiff > 1 else ''}"
-                        f" than expected)"
-                    )
-                else:
-                    ldiff = len(val) - len(ref)
-                    firstExtra = ellipsis(
-                        repr(list(set(val.keys()) - set(ref.keys()))[0]),
-                        30
-                    )
-                    return (
-                        f"dictionary has extra key {firstExtra} (has"
-                        f" {ldiff} more key{'s' if ldiff > 1 else ''}"
-                        f" than expected)"
-                    )
-                return (
-                    f"dictionaries {svr} and {srr} have different sizes"
-                    f" ({len(val)} and {len(ref)})"
-                )
-
-            vkeys = set(val.keys())
-            rkeys = set(ref.keys())
-            try:
-                onlyVal = sorted(vkeys - rkeys)
-                onlyRef = sorted(rkeys - vkeys)
-                keyCorrespondence = {}
-            except TypeError: # unsortable...
-                keyCorrespondence = None
-
-            # Check for floating-point equivalence of keys if sets are
-            # sortable...
-            if keyCorrespondence is not None:
-                if findFirstDifference(onlyVal, onlyRef, comparing) is None:
-                    keyCorrespondence = {
-                        onlyVal[i]: onlyRef[i]
-                        for i in range(len(onlyVal))
-                    }
-                    # Add pass-through mappings for matching keys
-                    for k in vkeys & rkeys:
-                        keyCorrespondence[k] = k
-                else:
-                    # No actual mapping is available...
-                    keyCorrespondence = None
-
-            # We couldn't find a correspondence between keys, so we
-            # return a key-based difference
-            if keyCorrespondence is None:
-                onlyVal = vkeys - rkeys
-                onlyRef = rkeys - vkeys
-                nExtra = len(onlyVal)
-                nMissing = len(onlyRef)
-                if nExtra == 0:
-                    firstMissing = ellipsis(repr(list(onlyRef)[0]), 10)
-                    result = f"dictionary is missing key {firstMissing}"
-                    if nMissing > 1:
-                        result += f" ({nMissing} missing keys in total)"
-                    return result
-                elif nMissing == 0:
-                    firstExtra = ellipsis(repr(list(onlyVal)[0]), 10)
-                    result = f"dictionary has extra key {firstExtra}"
-                    if nExtra > 1:
-                        result += f" ({nExtra} extra keys in total)"
-                    return result
-                else: # neither is 0
-                    firstMissing = ellipsis(repr(list(onlyRef)[0]), 10)
-                    firstExtra = ellipsis(repr(list(onlyVal)[0]), 10)
-                    result = (
-                        f"dictionary is missing key {firstMissing} and"
-                        f" has extra key {firstExtra}"
-                    )
-                    if nMissing > 1 and nExtra > 1:
-                        result += (
-                            f" ({nMissing} missing and {nExtra} extra"
-                            f" keys in total)"
-                        )
-                    elif nMissing == 1:
-                        if nExtra > 1:
-                            result += (
-                                f" (1 missing and {nExtra} extra keys"
-                                f" in total)"
-                            )
-                    else: # nExtra must be 1
-                        if nMissing > 1:
-                            result += (
-                                f" (1 extra and {nMissing} missing keys"
-                                f" in total)"
-                            )
-                    return result
-
-            # if we reach here, keyCorrespondence maps val keys to
-            # equivalent (but not necessarily identical) ref keys
-
-            for vk in keyCorrespondence:
-                rk = keyCorrespondence[vk]
-                vdiff = findFirstDifference(val[vk], ref[rk], comparing)
-                if vdiff is not None:
-                    krep = ellipsis(repr(vk), 14)
-                    return f"in dictionary slot {krep}, " + vdiff
-
-            return None
+        elif isinstance(val, (list, tuple, set, dict)):
+            return container_difference_steps(val, ref, skip)
 
         else: # not sure what kind of thing this is...
             if val == ref:
@@ -2644,6 +2624,289 @@ def findFirstDifference(val, ref, comparing=None):
                 return f" objects {svr} and {srr} are different"
 
 
+def container_difference_steps(val, ref, skip=0):
+    """
+    A generator which finds the first difference between two lists,
+    tuples, sets, or dictionaries of the same type for
+    `findFirstDifference`. Instead of recursing, it yields a (val, ref,
+    skip) triple for each pair of items (or other values) that need to
+    be compared, and expects the difference between them (a string or
+    None) to be sent back. Its return value (the StopIteration value) is
+    a string describing the difference between val and ref, or None if
+    they're equivalent.
+
+    If skip is positive, items are compared one by one rather than
+    skipping equal ones with `find_first_unequal`, and skip is passed on
+    for comparing them (see `first_difference_step`).
+    """
+    def next_unequal(vals, refs, start=0):
+        """
+        Finds the next index at or after start that could hold a
+        difference between vals and refs (or None if there isn't one).
+        """
+        if skip == 0:
+            return find_first_unequal(vals, refs, start)
+        elif start < len(vals):
+            return start
+        else:
+            return None
+
+    if isinstance(val, (list, tuple)): # both lists or tuples
+        typ = type(val).__name__
+        if len(val) != len(ref):
+            svr = ellipsis(deep_safe_repr(val), 10)
+            srr = ellipsis(deep_safe_repr(ref), 10)
+            return (
+                f"{typ}s {svr} and {srr} have different lengths"
+                f" ({len(val)} and {len(ref)})"
+            )
+        else:
+            # Only slots which aren't == can differ, so skip to those
+            i = next_unequal(val, ref)
+            while i is not None:
+                diff = yield (val[i], ref[i], skip)
+                if diff is not None:
+                    return f"in slot {i} of {typ}, " + diff
+                i = next_unequal(val, ref, i + 1)
+            return None # no differences in any slot
+
+    elif isinstance(val, (set)): # both sets
+        onlyVal = (val - ref)
+        onlyRef = (ref - val)
+        # Sort so we can match up different-but-equivalent
+        # floating-point items...
+        try:
+            sonlyVal = sorted(onlyVal)
+            sonlyRef = sorted(onlyRef)
+            diff = yield (sonlyVal, sonlyRef, skip)
+        except TypeError:
+            # not sortable, so not just floating-point diffs
+            diff = "some"
+
+        if diff is None:
+            return None
+        else:
+            nMissing = len(onlyRef)
+            nExtra = len(onlyVal)
+            if nExtra == 0:
+                firstMissing = ellipsis(repr(list(onlyRef)[0]), 12)
+                result = f"in a set, missing element {firstMissing}"
+                if nMissing > 1:
+                    result += f" ({nMissing} missing elements in total)"
+                return result
+            elif nMissing == 0:
+                firstExtra = ellipsis(repr(list(onlyVal)[0]), 12)
+                return f"in a set, extra element {firstExtra}"
+                if nExtra > 1:
+                    result += f" ({nExtra} extra elements in total)"
+                return result
+            else:
+                firstMissing = ellipsis(repr(list(onlyRef)[0]), 8)
+                firstExtra = ellipsis(repr(list(onlyVal)[0]), 8)
+                result = (
+                    "in a set, elements are different (extra"
+                    f" element {firstExtra} and missing element"
+                    f" {firstMissing}"
+                )
+                if nMissing > 1 and nExtra > 1:
+                    result += (
+                        f" ({nExtra} total extra elements and"
+                        f" {nMissing} total missing elements"
+                    )
+                elif nMissing == 1:
+                    if nExtra > 1:
+                        result += (
+                            f" (1 missing and {nExtra} total extra"
+                            f" elements)"
+                        )
+                else: # nExtra must be 1
+                    if nMissing > 1:
+                        result += (
+                            f" (1 extra and {nExtra} total missing"
+                            f" elements)"
+                        )
+                return result
+
+    elif isinstance(val, dict): # both dicts
+        if len(val) != len(ref):
+            if len(val) < len(ref):
+                ldiff = len(ref) - len(val)
+                firstMissing = ellipsis(
+                    repr(list(set(ref.keys()) - set(val.keys()))[0]),
+                    30
+                )
+                return (
+                    f"dictionary is missing key {firstMissing} (has"
+                    f" {ldiff} fewer key{'s' if ldiff > 1 else ''}"
+                    f" than expected)"
+                )
+            else:
+                ldiff = len(val) - len(ref)
+                firstExtra = ellipsis(
+                    repr(list(set(val.keys()) - set(ref.keys()))[0]),
+                    30
+                )
+                return (
+                    f"dictionary has extra key {firstExtra} (has"
+                    f" {ldiff} more key{'s' if ldiff > 1 else ''}"
+                    f" than expected)"
+                )
+
+        vkeys = set(val.keys())
+        rkeys = set(ref.keys())
+        try:
+            onlyVal = sorted(vkeys - rkeys)
+            onlyRef = sorted(rkeys - vkeys)
+            keyCorrespondence = {}
+        except TypeError: # unsortable...
+            keyCorrespondence = None
+
+        # Check for floating-point equivalence of keys if sets are
+        # sortable...
+        if keyCorrespondence is not None:
+            if (yield (onlyVal, onlyRef, skip)) is None:
+                keyCorrespondence = {
+                    onlyVal[i]: onlyRef[i]
+                    for i in range(len(onlyVal))
+                }
+                # Add pass-through mappings for matching keys
+                for k in vkeys & rkeys:
+                    keyCorrespondence[k] = k
+            else:
+                # No actual mapping is available...
+                keyCorrespondence = None
+
+        # We couldn't find a correspondence between keys, so we
+        # return a key-based difference
+        if keyCorrespondence is None:
+            onlyVal = vkeys - rkeys
+            onlyRef = rkeys - vkeys
+            nExtra = len(onlyVal)
+            nMissing = len(onlyRef)
+            if nExtra == 0:
+                firstMissing = ellipsis(repr(list(onlyRef)[0]), 10)
+                result = f"dictionary is missing key {firstMissing}"
+                if nMissing > 1:
+                    result += f" ({nMissing} missing keys in total)"
+                return result
+            elif nMissing == 0:
+                firstExtra = ellipsis(repr(list(onlyVal)[0]), 10)
+                result = f"dictionary has extra key {firstExtra}"
+                if nExtra > 1:
+                    result += f" ({nExtra} extra keys in total)"
+                return result
+            else: # neither is 0
+                firstMissing = ellipsis(repr(list(onlyRef)[0]), 10)
+                firstExtra = ellipsis(repr(list(onlyVal)[0]), 10)
+                result = (
+                    f"dictionary is missing key {firstMissing} and"
+                    f" has extra key {firstExtra}"
+                )
+                if nMissing > 1 and nExtra > 1:
+                    result += (
+                        f" ({nMissing} missing and {nExtra} extra"
+                        f" keys in total)"
+                    )
+                elif nMissing == 1:
+                    if nExtra > 1:
+                        result += (
+                            f" (1 missing and {nExtra} extra keys"
+                            f" in total)"
+                        )
+                else: # nExtra must be 1
+                    if nMissing > 1:
+                        result += (
+                            f" (1 extra and {nMissing} missing keys"
+                            f" in total)"
+                        )
+                return result
+
+        # if we reach here, keyCorrespondence maps val keys to
+        # equivalent (but not necessarily identical) ref keys
+
+        # As with lists, only values which aren't == can differ
+        vkeys = list(keyCorrespondence)
+        vvals = [val[vk] for vk in vkeys]
+        rvals = [ref[keyCorrespondence[vk]] for vk in vkeys]
+        i = next_unequal(vvals, rvals)
+        while i is not None:
+            vdiff = yield (vvals[i], rvals[i], skip)
+            if vdiff is not None:
+                krep = ellipsis(repr(vkeys[i]), 14)
+                return f"in dictionary slot {krep}, " + vdiff
+            i = next_unequal(vvals, rvals, i + 1)
+
+        return None
+
+
+def find_first_unequal(vals, refs, start=0, block=16):
+    """
+    Given two sequences of the same length, returns the first index at
+    or after start where their items are not equal (according to ==),
+    or None if there is no such index.
+
+    Apart from the item at start, which is checked on its own in case
+    every item is unequal, this compares whole slices rather than single
+    items, starting with block items and doubling the slice size each
+    time a slice matches, so that long runs of equal items are skipped
+    by the built-in sequence comparison. Once a slice doesn't match, it
+    is repeatedly halved to home in on the first unequal item. A
+    comparison that raises a RecursionError counts as unequal.
+    """
+    def same(lo, hi):
+        """
+        Whether the lo:hi slices of vals and refs are equal.
+        """
+        try:
+            return vals[lo:hi] == refs[lo:hi]
+        except RecursionError:
+            return False
+
+    if start >= len(vals):
+        return None
+    try:
+        if not vals[start] == refs[start]:
+            return start
+    except RecursionError:
+        return start
+
+    lo = start + 1
+    while lo < len(vals):
+        hi = min(len(vals), lo + block)
+        if same(lo, hi):
+            lo = hi
+            block *= 2
+            continue
+
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if same(lo, mid):
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+    return None
+
+
+def test_find_first_unequal():
+    """Tests for find_first_unequal."""
+    assert find_first_unequal([], []) is None
+    assert find_first_unequal([1, 2, 3], [1, 2, 3]) is None
+    assert find_first_unequal([1, 2, 3], [1, 2, 4]) == 2
+    assert find_first_unequal([1, 2, 3], [0, 2, 4]) == 0
+    assert find_first_unequal([1, 2, 3], [0, 2, 4], 1) == 2
+    big = list(range(1000))
+    other = big[:]
+    assert find_first_unequal(big, other) is None
+    other[700] = -1
+    other[900] = -1
+    assert find_first_unequal(big, other) == 700
+    assert find_first_unequal(big, other, 701) == 900
+    assert find_first_unequal(big, other, 901) is None
+    assert find_first_unequal(tuple(big), tuple(other), 3, block=1) == 700
+
+
 def checkContainment(val1, val2):
     """
     Returns True if val1 is 'contained in' to val2, and False otherwise.
@@ -2870,6 +3133,61 @@ def test_compare():
     assert compare({A(1), A(2)}, {A(1), A(3)}) is False
 
 
+def test_deep_compare():
+    """Tests for findFirstDifference on deep and cyclic structures."""
+    def nested(depth, leaf):
+        top = current = []
+        for _ in range(depth):
+            inner = [0]
+            current.append(inner)
+            current = inner
+        current.append(leaf)
+        return top
+
+    depth = sys.getrecursionlimit() * 5
+    assert compare(nested(depth, 1.0), nested(depth, 1.0 + 1e-12))
+    diff = findFirstDifference(nested(depth, 1), nested(depth, 2))
+    assert diff.startswith("in slot 0 of list, in slot 1 of list, ")
+    assert diff.endswith("in slot 1 of list, numbers 1 and 2 are different")
+    assert diff.count("in slot 1 of list") == depth
+    assert findFirstDifference(
+        [nested(depth, 1)],
+        [nested(depth, 1), 2]
+    ).startswith("lists [[[0, [... and [[[0, [... have different lengths")
+
+    # Errors from comparing items are raised as usual
+    class Unequal:
+        def __eq__(self, other):
+            raise ValueError("can't compare")
+
+    try:
+        findFirstDifference([[Unequal()]], [[Unequal()]])
+    except ValueError:
+        pass
+    else:
+        assert False, "expected a ValueError"
+
+    a = [1]
+    a.append(a)
+    b = [1]
+    b.append(b)
+    assert compare(a, b)
+    c = [2]
+    c.append(c)
+    assert findFirstDifference(a, c) == (
+        "in slot 0 of list, numbers 1 and 2 are different"
+    )
+    d = {"x": 1.0}
+    d["self"] = d
+    e = {"x": 1.0 + 1e-12}
+    e["self"] = e
+    assert compare(d, e)
+    e["x"] = 1.5
+    assert findFirstDifference(d, e) == (
+        "in dictionary slot 'x', numbers 1.0 and 1.5 are different"
+    )
+
+
 #-----------------------#
 # Configuration control #
 #-----------------------#
@@ -3063,6 +3381,119 @@ def listAllCases():
     return result
 
 
+def _run_function_case(function, args, kwargs, inputs):
+    """
+    Runs a function with the given arguments and inputs as a
+    `FunctionCase` would, returning the results dictionary. This is what
+    worker processes run for `runCasesInParallel`, so everything passed
+    in and returned must be picklable.
+    """
+    return run_with_capture(
+        lambda: function(*args, **kwargs),
+        inputs
+    )
+
+
+def runCasesInParallel(suiteName=None, workers=None):
+    """
+    Runs every function test case (`FunctionCase`) in the current test
+    suite (or the named suite if an argument is provided) that hasn't
+    been run yet, spreading them across a pool of worker processes (by
+    default one per CPU; give workers to change this). Results are
+    stored in each case, so checks made afterwards use them instead of
+    running the case again, and produce exactly the messages they would
+    have otherwise. Printed output from cases that echo it (see
+    `showPrintedLines`) is shown when the case's results are first
+    used, just as if the case had been run at that point.
+
+    Call this after creating cases and before checking them:
+
+    ```py
+    cases = [tester.case(n) for n in range(100)]
+    runCasesInParallel()
+    for n, case in enumerate(cases):
+        case.checkReturnValue(n * 2)
+    ```
+
+    The function, arguments, and results of each case must be
+    picklable, and cases must not depend on each other's side effects,
+    since each runs in a separate process (so, for example, changes a
+    function makes to its arguments won't be seen). Cases that can't be
+    sent to a worker or whose results can't be sent back are run
+    normally instead. Where possible workers are started by forking, so
+    that test files don't get re-imported in each worker.
+
+    Returns the number of cases that were run in worker processes.
+    """
+    cases = [
+        case
+        for case in listCasesInSuite(suiteName)
+        if isinstance(case, FunctionCase) and case.results is None
+    ]
+    if len(cases) == 0:
+        return 0
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = None
+
+    ran = 0
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context
+    ) as pool:
+        pending = [
+            pool.submit(
+                _run_function_case,
+                case.manager.target,
+                case.args,
+                case.kwargs,
+                case.inputs
+            )
+            for case in cases
+        ]
+        for case, future in zip(cases, pending):
+            try:
+                results = future.result()
+            except Exception:
+                # Couldn't send the case to a worker or get results back
+                # (or the worker died); run it here instead
+                case.run()
+                continue
+            case.results = results
+            if case.echo or (case.echo is None and _SHOW_OUTPUT):
+                case._pending_echo = results["output"]
+            ran += 1
+
+    return ran
+
+
+def test_runCasesInParallel():
+    """Tests for runCasesInParallel."""
+    oldSuite = currentTestSuite()
+    startTestSuite("test_runCasesInParallel")
+    try:
+        tester = testFunction(ellipsis)
+        cases = [
+            tester.case("a" * n, maxlen=10)
+            for n in range(20)
+        ]
+        failing = tester.case(None)
+        local = testFunction(lambda x: x + 1).case(1)
+        assert runCasesInParallel(workers=2) == 21
+        for n, case in enumerate(cases):
+            assert case.results["result"] == ellipsis("a" * n, 10)
+            assert case.results["output"] == ""
+        assert isinstance(failing.results["error"], TypeError)
+        assert "Traceback" in failing.results["traceback"]
+        assert local.results["result"] == 2
+        assert runCasesInParallel() == 0
+    finally:
+        del ALL_CASES["test_runCasesInParallel"]
+        startTestSuite(oldSuite)
+
+
 #---------------#
 # Color control #
 #---------------#
@@ -3805,7 +4236,7 @@ def walk_ast_in_order(node):
         yield node
 
 
-def find_call_nodes_on_line(node, frame, function, lineno):
+def find_call_nodes_on_line(node, frame, function, lineno, index=None):
     """
     Given an AST node, a stack frame, a function object, and a line
     number, looks for all function calls which occur on the given line
@@ -3828,6 +4259,13 @@ def find_call_nodes_on_line(node, frame, function, lineno):
     The return value will be a list of ast.Call nodes, and they will be
     ordered in the same order that those nodes would be executed when
     the line of code is executed.
+
+    If index is provided, it should be a dictionary like those returned
+    by `get_source_info` for the file that node was parsed from, and its
+    "nodes" and "calls" entries will be used to find nodes on the target
+    line instead of walking the whole AST. Either way, the parent
+    attributes set up by `assign_parents` are needed to find calls that
+    start on a preceding line.
     """
     def call_matches(call_node):
         """
@@ -3861,15 +4299,21 @@ def find_call_nodes_on_line(node, frame, function, lineno):
 
     result = []
     all_on_line = []
-    for child in walk_ast_in_order(node):
-        # only consider call nodes on the target line
-        if (
-            hasattr(child, "lineno")
-        and child.lineno == lineno
-        ):
-            all_on_line.append(child)
-            if isinstance(child, ast.Call) and call_matches(child):
+    if index is not None:
+        all_on_line = index["nodes"].get(lineno, [])
+        for child in index["calls"].get(lineno, []):
+            if call_matches(child):
                 result.append(child)
+    else:
+        for child in walk_ast_in_order(node):
+            # only consider call nodes on the target line
+            if (
+                hasattr(child, "lineno")
+            and child.lineno == lineno
+            ):
+                all_on_line.append(child)
+                if isinstance(child, ast.Call) and call_matches(child):
+                    result.append(child)
 
     # If we didn't find any candidates, look outwards from ast nodes on
     # the target line to find a Call that encompasses them...
@@ -3930,28 +4374,33 @@ def assign_parents(root):
     root.parent = None
 
 
-def is_inside_call_func(node):
+def is_inside_call_func(node, root=None):
     """
     Given an AST node which has a parent attribute, traverses parents to
-    see if this node is part of the func attribute of a Call node.
+    see if this node is part of the func attribute of a Call node. If a
+    root node is given, the search stops there, so only Call nodes
+    within root are considered.
     """
-    if not hasattr(node, "parent") or node.parent is None:
+    if node is root or not hasattr(node, "parent") or node.parent is None:
         return False
     if isinstance(node.parent, ast.Call) and node.parent.func is node:
         return True
     else:
-        return is_inside_call_func(node.parent)
+        return is_inside_call_func(node.parent, root)
 
 
-def tag_for(located):
+def tag_for(located, detail_level=None):
     """
     Given a dictionary which has 'file' and 'line' slots, returns a
     string to be used as the tag for a test with 'filename:line' as the
-    format. Unless the `DETAIL_LEVEL` is 2 or higher, the filename will
-    be shown without the full path.
+    format. Unless the `DETAIL_LEVEL` (or the given detail_level, if
+    there is one) is 2 or higher, the filename will be shown without the
+    full path.
     """
+    if detail_level is None:
+        detail_level = DETAIL_LEVEL
     filename = located.get('file', '???')
-    if DETAIL_LEVEL < 2:
+    if detail_level < 2:
         filename = os.path.basename(filename)
     line = located.get('line', '?')
     return f"{filename}:{line}"
@@ -3978,6 +4427,86 @@ def get_my_location(speculate_filename=True):
     return { "file": filename, "line": lineno }
 
 
+def get_source_info(filename):
+    """
+    Returns a dictionary with information about the Python source file
+    with the given name, with the following keys:
+
+    - src: The source code string
+    - tree: The parsed AST for the whole file, with parent attributes
+        assigned by `assign_parents`
+    - nodes: A dictionary mapping line numbers to lists of all AST nodes
+        that start on that line, in the order given by
+        `walk_ast_in_order`
+    - calls: A dictionary like nodes but only including ast.Call nodes
+
+    Results are cached in `SOURCE_CACHE`, and the file is only read and
+    parsed again if its modification time or size has changed since the
+    last time. Nodes in the result are shared between calls, so callers
+    must not modify them.
+
+    Raises an OSError if the file can't be read, or a SyntaxError if it
+    can't be parsed.
+    """
+    stat = os.stat(filename)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    info = SOURCE_CACHE.get(filename)
+    if info is not None and info["stamp"] == stamp:
+        return info
+
+    with open(filename, 'r') as fin:
+        src = fin.read()
+    tree = ast.parse(src, filename=filename, mode='exec')
+    assign_parents(tree)
+    nodes = {}
+    calls = {}
+    for node in walk_ast_in_order(tree):
+        if hasattr(node, "lineno"):
+            nodes.setdefault(node.lineno, []).append(node)
+            if isinstance(node, ast.Call):
+                calls.setdefault(node.lineno, []).append(node)
+
+    info = {
+        "stamp": stamp,
+        "src": src,
+        "tree": tree,
+        "nodes": nodes,
+        "calls": calls
+    }
+    SOURCE_CACHE[filename] = info
+    return info
+
+
+def test_get_source_info():
+    """Tests for get_source_info and its use in find_call_nodes_on_line."""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "example.py")
+        with open(filename, 'w') as fout:
+            fout.write("x = f(1)\ny = g(\n  f(2),\n  3\n) + f(4)\n")
+        info = get_source_info(filename)
+        assert get_source_info(filename) is info
+        assert [c.func.id for c in info["calls"][2]] == ['g']
+        assert [c.args[0].value for c in info["calls"][5]] == [4]
+        assert find_call_nodes_on_line(
+            info["tree"], None, 'f', 3, info
+        ) == info["calls"][3]
+        assert find_call_nodes_on_line(
+            info["tree"], None, 'g', 4, info
+        ) == find_call_nodes_on_line(info["tree"], None, 'g', 4)
+        assert len(find_call_nodes_on_line(
+            info["tree"], None, 'g', 4, info
+        )) == 1
+
+        # Changing the file (and so its size) invalidates the cache
+        with open(filename, 'w') as fout:
+            fout.write("z = h(5)\n")
+        fresh = get_source_info(filename)
+        assert fresh is not info
+        assert [c.func.id for c in fresh["calls"][1]] == ['h']
+        del SOURCE_CACHE[filename]
+
+
 def get_my_context(function_or_name):
     """
     Returns a dictionary indicating the context of a function call,
@@ -4017,11 +4546,12 @@ def get_my_context(function_or_name):
         filename = get_filename(frame)
         lineno = get_code_line(frame)
         if filename is None:
-            src = None
+            info = None
         else:
             try:
-                with open(filename, 'r') as fin:
-                    src = fin.read()
+                info = get_source_info(filename)
+            except SyntaxError:
+                raise
             except Exception:
                 # We'll assume here that the source is something like an
                 # interactive shell so we won't warn unless the detail
@@ -4042,21 +4572,21 @@ def get_my_context(function_or_name):
                         ),
                         file=sys.stderr
                     )
-                src = None
+                info = None
 
-        if src is None:
+        if info is None:
             return {
                 "file": filename,
                 "line": lineno
             }
 
-        src_node = ast.parse(src, filename=filename, mode='exec')
-        assign_parents(src_node)
+        src = info["src"]
         candidates = find_call_nodes_on_line(
-            src_node,
+            info["tree"],
             frame,
             function_or_name,
-            lineno
+            lineno,
+            info
         )
 
         # What if there are zero candidates?
@@ -4085,9 +4615,6 @@ def get_my_context(function_or_name):
 
         arg_expr = match.args[0]
 
-        # Add .parent attributes
-        assign_parents(arg_expr)
-
         # Source code for the expression
         expr_src = get_expr_src(src, match)
 
@@ -4117,7 +4644,7 @@ def get_my_context(function_or_name):
                     # would probably be inaccurate.
                     val = deepish_copy(evaluate_in_context(node, frame))
                     result["values"][key] = val
-                    if not is_inside_call_func(node):
+                    if not is_inside_call_func(node, arg_expr):
                         result["relevant"].add(key)
 
         return result
@@ -8,6 +8,7 @@ Purpose: Yelp task tests: tests functions for working with the Yelp data
 """
 
 import json
+import os
 import yelp
 import optimism
 import test_data as td
@@ -58,6 +59,81 @@ testLD.case("soloYelp.json").checkReturnValue(td.soloYelpLoaded)
 testLD.case("microYelp.json").checkReturnValue(td.microYelpLoaded)
 testLD.case("miniYelp.json").checkReturnValue(td.miniYelpLoaded)
 
+# Cached loads write a snapshot and reuse it until the file changes
+with open('results/cachedYelp.json', 'w') as fileWriter:
+    json.dump(td.microYelpLoaded, fileWriter)
+optimism.expect(
+    yelp.loadData('results/cachedYelp.json', cache=True),
+    td.microYelpLoaded
+)
+optimism.expect(
+    os.path.exists('results/cachedYelp.json' + yelp.SNAPSHOT_SUFFIX),
+    True
+)
+optimism.expect(
+    yelp.loadData('results/cachedYelp.json', cache=True, verifyHash=True),
+    td.microYelpLoaded
+)
+with open('results/cachedYelp.json', 'w') as fileWriter:
+    json.dump(td.soloYelpLoaded, fileWriter)
+optimism.expect(
+    yelp.loadData('results/cachedYelp.json', cache=True),
+    td.soloYelpLoaded
+)
+
+# A corrupt snapshot (here, one naming a global that doesn't exist) is
+# ignored and replaced by re-parsing the file
+with open('results/cachedYelp.json' + yelp.SNAPSHOT_SUFFIX, 'wb') as f:
+    f.write(b'cbuiltins\nzzz\n.')
+optimism.expect(
+    yelp.loadData('results/cachedYelp.json', cache=True),
+    td.soloYelpLoaded
+)
+
+# Interned loads give equal data with shared city and category strings
+internedMini = yelp.loadData("miniYelp.json", intern=True)
+optimism.expect(internedMini, td.miniYelpLoaded)
+cityCopies = {}
+for bus in internedMini.values():
+    cityCopies.setdefault(bus['city'], set()).add(id(bus['city']))
+optimism.expect(len(cityCopies), len(yelp.uniqueCities(internedMini)))
+optimism.expect(set(map(len, cityCopies.values())), {1})
+
+# Streaming loaders produce (bizID, business) pairs instead of a dict
+optimism.expect(dict(yelp.streamData("soloYelp.json")), td.soloYelpLoaded)
+optimism.expect(dict(yelp.streamData("miniYelp.json")), td.miniYelpLoaded)
+optimism.expect(
+    dict(yelp.streamData("microYelp.json", chunkSize=7)),
+    td.microYelpLoaded
+)
+
+# Bare values split across chunks (e.g. '1.' then '5') are read whole
+with open('results/scalars.json', 'w') as fileWriter:
+    fileWriter.write(
+        '{"a": 1.5, "b": 2e3, "c": -17, "d": true, "e": null,"f":0.25}'
+    )
+for scalarChunkSize in range(1, 9):
+    scalarPairs = dict(
+        yelp.streamData('results/scalars.json', chunkSize=scalarChunkSize)
+    )
+    optimism.expect(scalarPairs, yelp.loadData('results/scalars.json'))
+
+with open('results/microYelp.jsonl', 'w') as fileWriter:
+    for bizID, bus in td.microYelpLoaded.items():
+        fileWriter.write(json.dumps(dict(bus, business_id=bizID)) + '\n')
+optimism.expect(
+    dict(yelp.streamDataLines('results/microYelp.jsonl')),
+    td.microYelpLoaded
+)
+optimism.expect(
+    yelp.findCategories(yelp.streamData("miniYelp.json"), 50),
+    {"Restaurants": 106, "Shopping": 50}
+)
+optimism.expect(
+    yelp.getBusinessCount(yelp.streamData("miniYelp.json"), "pizza hut"),
+    2
+)
+
 testGBC = optimism.testFunctionMaybe(yelp, "getBusinessCount")
 testGBC.case(td.soloYelpLoaded, "Retz's Laconi's II").checkReturnValue(1)
 testGBC.case(td.microYelpLoaded, "McDonald's").checkReturnValue(1)
@@ -96,6 +172,13 @@ testUC.case(td.miniYelpLoaded).checkReturnValue(
     ]
 )
 
+testUC.case(td.miniYelpLoaded, collation='casefold').checkReturnValue(
+    sorted(
+        yelp.uniqueCities(td.miniYelpLoaded),
+        key=lambda city: (city.lower(), city)
+    )
+)
+
 testFB = optimism.testFunctionMaybe(yelp, "findBusinesses")
 testFB.case(
     td.soloYelpLoaded,
@@ -475,3 +558,491 @@ testBPP.case(td.miniYelpLoaded).checkReturnValue(
         }
     ]
 )
+
+# Queries answered through a prebuilt YelpIndex must match plain scans
+miniIndex = yelp.YelpIndex(td.miniYelpLoaded)
+optimism.expect(
+    yelp.getBusinessCount(td.miniYelpLoaded, "pizza hut", index=miniIndex),
+    2
+)
+optimism.expect(
+    yelp.uniqueCities(td.miniYelpLoaded, index=miniIndex),
+    yelp.uniqueCities(td.miniYelpLoaded)
+)
+optimism.expect(
+    yelp.findCategories(td.miniYelpLoaded, 50, index=miniIndex),
+    {"Restaurants": 106, "Shopping": 50}
+)
+optimism.expect(
+    yelp.bestPizzaPlace(td.miniYelpLoaded, index=miniIndex),
+    yelp.bestPizzaPlace(td.miniYelpLoaded)
+)
+yelp.findBusinesses(
+    td.miniYelpLoaded,
+    'Restaurants', 'Las Vegas', 2, 1,
+    'results/testFB-mini-indexed.json',
+    index=miniIndex
+)
+yelp.findBusinesses(
+    td.miniYelpLoaded,
+    'Restaurants', 'Las Vegas', 2, 1,
+    'results/testFB-mini-scanned.json'
+)
+optimism.expect(
+    yelp.loadData('results/testFB-mini-indexed.json'),
+    yelp.loadData('results/testFB-mini-scanned.json')
+)
+
+# A ColumnarStore answers queries with NumPy masks (skipped without NumPy)
+if yelp.np is not None:
+    miniColumns = yelp.ColumnarStore(td.miniYelpLoaded)
+    optimism.expect(dict(miniColumns), td.miniYelpLoaded)
+    optimism.expect(
+        yelp.findCategories(miniColumns, 50),
+        {"Restaurants": 106, "Shopping": 50}
+    )
+    optimism.expect(
+        list(yelp.findCategories(miniColumns, 1)),
+        list(yelp.findCategories(td.miniYelpLoaded, 1))
+    )
+    yelp.findBusinesses(
+        miniColumns,
+        'Restaurants', 'Las Vegas', 2, 1,
+        'results/testFB-mini-columnar.json'
+    )
+    optimism.expect(
+        yelp.loadData('results/testFB-mini-columnar.json'),
+        yelp.loadData('results/testFB-mini-scanned.json')
+    )
+    optimism.expect(
+        yelp.bestPizzaPlace(miniColumns),
+        yelp.bestPizzaPlace(td.miniYelpLoaded)
+    )
+
+# Top-k selection keeps the tail of the full SortByStar ordering
+lasVegas = yelp.selectBusinesses(
+    td.miniYelpLoaded, 'Restaurants', 'Las Vegas', 2, 1
+)
+for limit in (0, 1, 3, 4, len(lasVegas) + 5):
+    optimism.expect(
+        yelp.selectBusinesses(
+            td.miniYelpLoaded, 'Restaurants', 'Las Vegas', 2, 1,
+            limit=limit
+        ),
+        lasVegas[-limit:] if limit else []
+    )
+testFB.case(
+    td.miniYelpLoaded,
+    'Restaurants', 'Las Vegas', 4, 30,
+    'results/testFB-Restaurants-LasVegas-4-30-top2.json',
+    limit=2
+).checkCustom(
+    checkJSONFile,
+    [
+      {
+        "address": "8560 Las Vegas Blvd S",
+        "categories": [
+          "Restaurants",
+          "American (Traditional)"
+        ],
+        "city": "Las Vegas",
+        "name": "Geebee's Bar & Grill",
+        "review_count": 33,
+        "stars": 4.5,
+        "state": "NV"
+      },
+      {
+        "address": "9905 S Eastern Ave, Ste 140",
+        "categories": [
+          "Seafood",
+          "Italian",
+          "Pizza",
+          "Restaurants"
+        ],
+        "city": "Las Vegas",
+        "name": "Trattoria Italia",
+        "review_count": 210,
+        "stars": 4.5,
+        "state": "NV"
+      }
+    ]
+)
+
+# writeBusinesses produces exactly what json.dump would, or JSON-Lines
+with open('results/testFB-mini-scanned.json', 'r') as fileReader:
+    dumpedText = fileReader.read()
+optimism.expect(dumpedText, json.dumps(lasVegas))
+yelp.findBusinesses(
+    td.miniYelpLoaded,
+    'Restaurants', 'Las Vegas', 2, 1,
+    'results/testFB-mini-Restaurants-LasVegas.jsonl',
+    format='jsonl'
+)
+with open('results/testFB-mini-Restaurants-LasVegas.jsonl', 'r') as fileReader:
+    writtenLines = [json.loads(line) for line in fileReader]
+optimism.expect(writtenLines, lasVegas)
+yelp.writeBusinesses([], 'results/empty.jsonl', 'jsonl')
+with open('results/empty.jsonl', 'r') as fileReader:
+    emptyText = fileReader.read()
+optimism.expect(emptyText, '')
+
+# A batch of findBusinesses queries is answered in one pass
+batchQueries = [
+    ('Food', 'Charlotte', 4, 10, 'results/batch-Food-Charlotte.json'),
+    ('Restaurants', 'Las Vegas', 2, 1, 'results/batch-Restaurants-LV.json'),
+    ('Pizza', 'Nowhere', 0, 0, 'results/batch-empty.json'),
+]
+yelp.findBusinessesBatch(yelp.streamData("miniYelp.json"), batchQueries)
+for batchQuery in batchQueries:
+    yelp.findBusinesses(
+        td.miniYelpLoaded,
+        *batchQuery[:4],
+        'results/batch-single.json'
+    )
+    optimism.expect(
+        yelp.loadData(batchQuery[4]),
+        yelp.loadData('results/batch-single.json')
+    )
+
+# Parallel category counting gives the same dictionary, in the same order
+# (guarded because worker processes may re-import this file)
+if __name__ == '__main__':
+    parallelCategories = yelp.findCategories(td.miniYelpLoaded, 1, workers=3)
+    optimism.expect(
+        list(parallelCategories.items()),
+        list(yelp.findCategories(td.miniYelpLoaded, 1).items())
+    )
+    optimism.expect(
+        yelp.findCategories(td.miniYelpLoaded, 50, workers=2),
+        {"Restaurants": 106, "Shopping": 50}
+    )
+
+# bestInCategory generalizes bestPizzaPlace; the index leaderboard agrees
+testBIC = optimism.testFunctionMaybe(yelp, "bestInCategory")
+testBIC.case(td.microYelpLoaded, 'Beauty & Spas').checkReturnValue(
+    [td.microYelpLoaded["7gquCdaFoHZCcLYDttpHtw"]]
+)
+testBIC.case(td.microYelpLoaded, 'Nowhere').checkReturnValue([])
+indexedBest = {}
+scannedBest = {}
+for someCategory in yelp.findCategories(td.miniYelpLoaded, 1):
+    indexedBest[someCategory] = yelp.bestInCategory(
+        td.miniYelpLoaded, someCategory, miniIndex
+    )
+    scannedBest[someCategory] = yelp.bestInCategory(
+        td.miniYelpLoaded, someCategory
+    )
+optimism.expect(indexedBest, scannedBest)
+
+# Name counts are built lazily and refreshed when the dictionary changes
+countedYelp = dict(td.microYelpLoaded)
+countedIndex = yelp.YelpIndex(countedYelp)
+optimism.expect(
+    yelp.getBusinessCount(countedYelp, "MCDONALD'S", index=countedIndex),
+    1
+)
+countedYelp['extraMcDonalds'] = dict(
+    td.microYelpLoaded["Wpt0sFHcPtV5MO9He7yMKQ"],
+    address='1 Main St'
+)
+optimism.expect(
+    yelp.getBusinessCount(countedYelp, "McDonald's", index=countedIndex),
+    2
+)
+countedYelp['extraMcDonalds'] = dict(
+    countedYelp['extraMcDonalds'],
+    name='Burger Shack'
+)
+countedIndex.invalidate()
+optimism.expect(
+    yelp.getBusinessCount(countedYelp, "mcdonald's", index=countedIndex),
+    1
+)
+
+# A memory-mapped store acts like the dictionary it was written from
+yelp.writeMappedStore(td.miniYelpLoaded, 'results/miniYelp.ymap')
+miniMapped = yelp.MappedStore('results/miniYelp.ymap')
+optimism.expect(dict(miniMapped), td.miniYelpLoaded)
+optimism.expect(list(miniMapped), list(td.miniYelpLoaded))
+optimism.expect(
+    miniMapped["XguKrY0dAuaK1W6HUlUQ1Q"],
+    td.miniYelpLoaded["XguKrY0dAuaK1W6HUlUQ1Q"]
+)
+optimism.expect("missing" in miniMapped, False)
+optimism.expect(
+    list(yelp.findCategories(miniMapped, 1).items()),
+    list(yelp.findCategories(td.miniYelpLoaded, 1).items())
+)
+optimism.expect(
+    yelp.selectBusinesses(miniMapped, 'Restaurants', 'Las Vegas', 2, 1),
+    lasVegas
+)
+optimism.expect(
+    yelp.uniqueCities(miniMapped),
+    yelp.uniqueCities(td.miniYelpLoaded)
+)
+optimism.expect(
+    yelp.bestPizzaPlace(miniMapped),
+    yelp.bestPizzaPlace(td.miniYelpLoaded)
+)
+miniMapped.close()
+
+# Slotted Business records work everywhere business dictionaries do
+miniRecords = yelp.asRecords(td.miniYelpLoaded)
+optimism.expect(miniRecords, td.miniYelpLoaded)
+optimism.expect(
+    miniRecords["XguKrY0dAuaK1W6HUlUQ1Q"].toDict(),
+    td.miniYelpLoaded["XguKrY0dAuaK1W6HUlUQ1Q"]
+)
+optimism.expect(yelp.getBusinessCount(miniRecords, "Pizza Hut"), 2)
+firstRecord = miniRecords["XguKrY0dAuaK1W6HUlUQ1Q"]
+recordHasName = 'name' in firstRecord
+recordHasZero = 0 in firstRecord
+optimism.expect(recordHasName, True)
+optimism.expect(recordHasZero, False)
+optimism.expect(firstRecord.get('name'), firstRecord.name)
+optimism.expect(firstRecord.get('website', 'none'), 'none')
+optimism.expect(list(firstRecord), list(yelp.BUSINESS_FIELDS))
+optimism.expect(len(firstRecord), len(yelp.BUSINESS_FIELDS))
+optimism.expect(hasattr(firstRecord, '__dict__'), False)
+optimism.expect(
+    yelp.uniqueCities(miniRecords),
+    yelp.uniqueCities(td.miniYelpLoaded)
+)
+optimism.expect(
+    yelp.findCategories(miniRecords, 50),
+    {"Restaurants": 106, "Shopping": 50}
+)
+optimism.expect(
+    yelp.bestPizzaPlace(miniRecords),
+    yelp.bestPizzaPlace(td.miniYelpLoaded)
+)
+yelp.findBusinesses(
+    miniRecords,
+    'Restaurants', 'Las Vegas', 2, 1,
+    'results/testFB-mini-records.json'
+)
+with open('results/testFB-mini-records.json', 'r') as fileReader:
+    recordsText = fileReader.read()
+optimism.expect(recordsText, dumpedText)
+
+# Range-index threshold queries agree with full scans at every threshold
+rangeResults = []
+scanResults = []
+for starLimit in (0, 2, 3.5, 4, 5):
+    for minReview in (0, 5, 30, 1000):
+        rangeResults.append(yelp.selectBusinesses(
+            td.miniYelpLoaded, 'Restaurants', 'Las Vegas',
+            starLimit, minReview,
+            index=miniIndex
+        ))
+        scanResults.append(yelp.selectBusinesses(
+            td.miniYelpLoaded, 'Restaurants', 'Las Vegas',
+            starLimit, minReview
+        ))
+optimism.expect(rangeResults, scanResults)
+optimism.expect(
+    miniIndex.thresholdMatches('Pizza', 'Cuyahoga Falls', 3, 20),
+    ["XguKrY0dAuaK1W6HUlUQ1Q"]
+)
+
+# Upserts and deletes through a YelpIndex keep every index up to date
+liveYelp = dict(td.microYelpLoaded)
+liveIndex = yelp.YelpIndex(liveYelp)
+liveIndex.ranges()
+liveIndex.upsert('newPizza', {
+    'state': 'NV', 'address': '1 Strip Blvd', 'review_count': 500,
+    'stars': 5.0, 'name': 'Slice of Vegas', 'city': 'Las Vegas',
+    'categories': ['Pizza', 'Restaurants']
+})
+liveIndex.upsert(
+    "Wpt0sFHcPtV5MO9He7yMKQ",
+    dict(td.microYelpLoaded["Wpt0sFHcPtV5MO9He7yMKQ"], city='Henderson')
+)
+liveIndex.delete("XguKrY0dAuaK1W6HUlUQ1Q")
+optimism.expect(liveYelp['newPizza']['name'], 'Slice of Vegas')
+optimism.expect("XguKrY0dAuaK1W6HUlUQ1Q" in liveYelp, False)
+optimism.expect(
+    yelp.uniqueCities(liveYelp, index=liveIndex),
+    yelp.uniqueCities(liveYelp)
+)
+optimism.expect(
+    yelp.findCategories(liveYelp, 1, index=liveIndex),
+    yelp.findCategories(liveYelp, 1)
+)
+optimism.expect(
+    yelp.bestPizzaPlace(liveYelp, index=liveIndex),
+    [liveYelp['newPizza']]
+)
+liveIndex.delete('newPizza')
+optimism.expect(yelp.bestPizzaPlace(liveYelp, index=liveIndex), [])
+optimism.expect(
+    yelp.selectBusinesses(
+        liveYelp, 'Restaurants', 'Henderson', 0, 0,
+        index=liveIndex
+    ),
+    [liveYelp["Wpt0sFHcPtV5MO9He7yMKQ"]]
+)
+
+# A business can be edited in place and then upserted
+editedYelp = dict(td.microYelpLoaded)
+editedYelp["XguKrY0dAuaK1W6HUlUQ1Q"] = dict(
+    td.microYelpLoaded["XguKrY0dAuaK1W6HUlUQ1Q"]
+)
+editedIndex = yelp.YelpIndex(editedYelp)
+editedIndex.ranges()
+editedIndex.nameCounts()
+editedBus = editedYelp["XguKrY0dAuaK1W6HUlUQ1Q"]
+editedBus['stars'] = 5.0
+editedIndex.upsert("XguKrY0dAuaK1W6HUlUQ1Q", editedBus)
+editedBus['city'] = 'Akron'
+editedBus['name'] = 'Akron Slice'
+editedIndex.upsert("XguKrY0dAuaK1W6HUlUQ1Q", editedBus)
+try:
+    editedIndex.upsert("XguKrY0dAuaK1W6HUlUQ1Q", {'city': 'Kent'})
+except KeyError:
+    pass
+freshIndex = yelp.YelpIndex(editedYelp)
+optimism.expect(editedIndex.byCity, freshIndex.byCity)
+optimism.expect(editedIndex.byCategory, freshIndex.byCategory)
+optimism.expect(editedIndex.leaders, freshIndex.leaders)
+optimism.expect(editedIndex.ranges(), freshIndex.ranges())
+optimism.expect(editedIndex.nameCounts(), freshIndex.nameCounts())
+optimism.expect(
+    yelp.selectBusinesses(
+        editedYelp, 'Pizza', 'Akron', 5, 0,
+        index=editedIndex
+    ),
+    [editedBus]
+)
+
+# Changing the dictionary directly and then calling invalidate rebuilds
+# every index, eager and lazy
+directYelp = dict(td.microYelpLoaded)
+directIndex = yelp.YelpIndex(directYelp)
+directIndex.ranges()
+directYelp['extraPizza'] = {
+    'state': 'NV', 'address': '3 Strip Blvd', 'review_count': 900,
+    'stars': 5.0, 'name': 'Pie Palace', 'city': 'Las Vegas',
+    'categories': ['Pizza', 'Restaurants']
+}
+directIndex.invalidate()
+optimism.expect(
+    yelp.selectBusinesses(
+        directYelp, 'Restaurants', 'Las Vegas', 0, 0,
+        index=directIndex
+    ),
+    yelp.selectBusinesses(directYelp, 'Restaurants', 'Las Vegas', 0, 0)
+)
+optimism.expect(
+    yelp.bestPizzaPlace(directYelp, index=directIndex),
+    [directYelp['extraPizza']]
+)
+del directYelp['extraPizza']
+del directYelp["XguKrY0dAuaK1W6HUlUQ1Q"]
+directIndex.invalidate()
+optimism.expect(
+    yelp.findCategories(directYelp, 1, index=directIndex),
+    yelp.findCategories(directYelp, 1)
+)
+optimism.expect(
+    yelp.bestPizzaPlace(directYelp, index=directIndex),
+    yelp.bestPizzaPlace(directYelp)
+)
+# Lazy lookups also notice businesses added directly without invalidate
+directYelp['extraPizza'] = dict(td.microYelpLoaded["XguKrY0dAuaK1W6HUlUQ1Q"])
+optimism.expect(
+    directIndex.thresholdMatches('Pizza', 'Cuyahoga Falls', 3, 20),
+    ['extraPizza']
+)
+
+# A QueryCache answers repeated queries once until the data changes
+cachedYelp = dict(td.microYelpLoaded)
+cachedIndex = yelp.YelpIndex(cachedYelp)
+queryCache = yelp.QueryCache(cachedIndex, maxEntries=2)
+optimism.expect(queryCache.findCategories(4), {"Restaurants": 5})
+optimism.expect(queryCache.findCategories(4), {"Restaurants": 5})
+optimism.expect((queryCache.hits, queryCache.misses), (1, 1))
+cachedCities = queryCache.uniqueCities()
+cachedCities.append('Not A City')
+optimism.expect(queryCache.uniqueCities(), yelp.uniqueCities(cachedYelp))
+queryCache.getBusinessCount("McDonald's")
+optimism.expect(len(queryCache._results), 2)
+cachedIndex.upsert('moreFood', {
+    'state': 'NV', 'address': '2 Strip Blvd', 'review_count': 1,
+    'stars': 1.0, 'name': "McDonald's", 'city': 'Las Vegas',
+    'categories': ['Restaurants']
+})
+optimism.expect(queryCache.findCategories(4), {"Restaurants": 6})
+optimism.expect(queryCache.getBusinessCount("mcdonald's"), 2)
+
+# The command line runs a file of queries against one loaded dataset
+with open('results/cliQueries.jsonl', 'w') as fileWriter:
+    fileWriter.write('{"query": "getBusinessCount", "args": ["pizza hut"]}\n')
+    fileWriter.write('{"query": "findCategories", "args": [50]}\n')
+    fileWriter.write('{"query": "noSuchQuery"}\n')
+cliStatus = yelp.main([
+    'miniYelp.json', 'results/cliQueries.jsonl', '--out-dir', 'results/cli'
+])
+optimism.expect(cliStatus, 1)
+optimism.expect(
+    yelp.loadData('results/cli/0000-getBusinessCount.json'),
+    {"result": 2}
+)
+optimism.expect(
+    yelp.loadData('results/cli/0001-findCategories.json'),
+    {"result": {"Restaurants": 106, "Shopping": 50}}
+)
+optimism.expect(
+    yelp.loadData('results/cli/0002-noSuchQuery.json'),
+    {"error": "ValueError: Unknown query 'noSuchQuery'"}
+)
+
+# Lines that aren't valid requests are reported as errors too, and never
+# name a file outside the output directory
+with open('results/cliBadQueries.jsonl', 'w') as fileWriter:
+    fileWriter.write('{"query": "findCategories", "args": [\n')
+    fileWriter.write('[1, 2]\n')
+    fileWriter.write('{"query": "a/b"}\n')
+    fileWriter.write('{"query": "findCategories", "args": [50]}\n')
+badCliStatus = yelp.main([
+    'miniYelp.json', 'results/cliBadQueries.jsonl',
+    '--out-dir', 'results/cliBad'
+])
+optimism.expect(badCliStatus, 1)
+badCliErrors = [
+    yelp.loadData(f'results/cliBad/{number:04d}-invalid.json')['error']
+    for number in range(3)
+]
+optimism.expect(badCliErrors[0].startswith('JSONDecodeError: '), True)
+optimism.expect(badCliErrors[1], 'ValueError: Query must be a JSON object')
+optimism.expect(badCliErrors[2], "ValueError: Unknown query 'a/b'")
+optimism.expect(
+    yelp.loadData('results/cliBad/0003-findCategories.json'),
+    {"result": {"Restaurants": 106, "Shopping": 50}}
+)
+
+# Bad query lines are also reported when queries run in worker processes
+# (guarded because worker processes may re-import this file)
+if __name__ == '__main__':
+    workerCliStatus = yelp.main([
+        'miniYelp.json', 'results/cliBadQueries.jsonl',
+        '--out-dir', 'results/cliWorkers', '--workers', '2'
+    ])
+    optimism.expect(workerCliStatus, 1)
+    optimism.expect(
+        sorted(os.listdir('results/cliWorkers')),
+        sorted(os.listdir('results/cliBad'))
+    )
+
+# Function cases can be run in worker processes before being checked
+# (guarded because worker processes may re-import this file)
+if __name__ == '__main__':
+    optimism.startTestSuite("parallel")
+    parallelFC = [testFC.case(td.miniYelpLoaded, t) for t in (50, 100, 200)]
+    parallelRan = optimism.runCasesInParallel(workers=2)
+    optimism.expect(parallelRan, 3)
+    parallelFC[0].checkReturnValue({"Restaurants": 106, "Shopping": 50})
+    parallelFC[1].checkReturnValue({"Restaurants": 106})
+    parallelFC[2].checkReturnValue({})
+    optimism.startTestSuite("default")
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Consulted:
+Date: 2026.10.18
+Purpose: Yelp server tests: runs a query server in-process and checks
+  that answers sent over a socket match calling yelp.py directly.
+"""
+
+import asyncio
+import os
+import tempfile
+import yelp
+import yelp_server
+import optimism
+import test_data as td
+
+optimism.skipChecksAfterFail('all')
+
+async def askServer(requests, outDir=None):
+    """
+    Starts a server for miniYelp on a temporary Unix socket (writing any
+    files in outDir), sends each (name, args) request over one
+    connection, and returns the results (or error messages) along with
+    the number of batches used.
+    """
+    socketPath = os.path.join(tempfile.mkdtemp(), 'yelp.sock')
+    server = yelp_server.QueryServer(dict(td.miniYelpLoaded), outDir)
+    ready = asyncio.Event()
+    serving = asyncio.create_task(
+        server.serve(unixPath=socketPath, ready=ready)
+    )
+    await ready.wait()
+    reader, writer = await yelp_server.connect(unixPath=socketPath)
+    answers = []
+    for name, args in requests:
+        try:
+            answers.append(
+                await yelp_server.query(reader, writer, name, *args)
+            )
+        except RuntimeError as e:
+            answers.append(str(e))
+    writer.close()
+    await writer.wait_closed()
+    # Let the server notice the closed connection before stopping it
+    await asyncio.sleep(0.05)
+    serving.cancel()
+    return answers, server.batches
+
+answers, batches = asyncio.run(askServer([
+    ("getBusinessCount", ["pizza hut"]),
+    ("findCategories", [50]),
+    ("uniqueCities", []),
+    ("bestPizzaPlace", []),
+    ("selectBusinesses", ["Restaurants", "Las Vegas", 4, 30]),
+    ("noSuchQuery", []),
+]))
+optimism.expect(answers[0], 2)
+optimism.expect(answers[1], {"Restaurants": 106, "Shopping": 50})
+optimism.expect(answers[2], yelp.uniqueCities(td.miniYelpLoaded))
+optimism.expect(answers[3], yelp.bestPizzaPlace(td.miniYelpLoaded))
+optimism.expect(
+    answers[4],
+    yelp.selectBusinesses(td.miniYelpLoaded, "Restaurants", "Las Vegas", 4, 30)
+)
+optimism.expect(answers[5], "ValueError: Unknown query 'noSuchQuery'")
+optimism.expect(batches, 6)
+
+# findBusinesses only writes inside the server's output directory
+outDir = tempfile.mkdtemp()
+outsideFile = os.path.join(tempfile.mkdtemp(), 'outside.json')
+vegasArgs = ["Restaurants", "Las Vegas", 4, 30]
+answers, batches = asyncio.run(askServer([
+    ("findBusinesses", vegasArgs + ["vegas.json"]),
+    ("findBusinesses", vegasArgs + [outsideFile]),
+    ("findBusinesses", vegasArgs + ["../outside.json"]),
+], outDir))
+optimism.expect(answers[0], None)
+optimism.expect(
+    yelp.loadData(os.path.join(outDir, "vegas.json")),
+    yelp.selectBusinesses(td.miniYelpLoaded, *vegasArgs)
+)
+optimism.expect(answers[1].startswith("ValueError: Output file"), True)
+optimism.expect(answers[2].startswith("ValueError: Output file"), True)
+optimism.expect(os.path.exists(outsideFile), False)
+optimism.expect(os.listdir(outDir), ["vegas.json"])
+answers, batches = asyncio.run(askServer([
+    ("findBusinesses", vegasArgs + ["vegas.json"]),
+]))
+optimism.expect(
+    answers[0],
+    "ValueError: findBusinesses needs a server started with --out-dir"
+)
@@ -12,79 +12,1321 @@ Purpose: Yelp task: Working with dictionaries and tuples and
 # Imports #
 #---------#
 
+import argparse
+import array
+import bisect
+import copy
+import hashlib
+import heapq
+import itertools
 # This will be needed to access JSON loading and storing functions.
 import json
+import locale
+import mmap
+import multiprocessing
+import os
+import pickle
+import struct
+import sys
+import time
+from collections import Counter, OrderedDict
+from collections.abc import ItemsView, Mapping, ValuesView
+from concurrent.futures import ProcessPoolExecutor
+
+# NumPy is optional; only ColumnarStore needs it.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#-----------#
+# Constants #
+#-----------#
+
+STREAM_CHUNK_SIZE = 1 << 16
+"""
+Number of characters read at a time by `streamData`.
+"""
+
+WRITE_BUFFER_SIZE = 1 << 16
+"""
+Size in bytes of the output buffer used by `writeBusinesses`.
+"""
+
+SNAPSHOT_SUFFIX = '.snapshot'
+"""
+Appended to a JSON file's name to get the name of the binary snapshot
+`loadData` caches its contents in.
+"""
+
+SNAPSHOT_VERSION = 1
+"""
+Format version stored in snapshot headers; snapshots with any other
+version are ignored.
+"""
+
+MAPPED_MAGIC = b'YELPMMAP'
+"""
+The first bytes of every file written by `writeMappedStore`.
+"""
+
+MAPPED_HEADER = struct.Struct('<8s?xxxIQQ')
+"""
+Header of a mapped store file: magic, whether the columns are
+little-endian, then the number of businesses, category entries and
+distinct strings.
+"""
+
+INTERNED_FIELDS = ('city', 'state', 'categories')
+"""
+Business fields whose (highly repetitive) string values are interned by
+`loadData` when asked to.
+"""
+
+QUERY_CACHE_ENTRIES = 256
+"""
+Default number of results a `QueryCache` remembers.
+"""
+
+BUSINESS_FIELDS = (
+    'state', 'address', 'review_count', 'stars', 'name', 'city', 'categories'
+)
+"""
+The keys of each business dictionary, in the order they appear in the
+Yelp data files.
+"""
 
 #---------------------------#
 # Write your functions here #
 #---------------------------#
-def loadData(filename):
-    '''load the data'''
+def loadData(filename, cache=False, verifyHash=False, intern=False):
+    '''load the data
+If cache is True, a binary snapshot of the data is kept next to the file
+(see SNAPSHOT_SUFFIX) and used instead of parsing the JSON whenever the
+file's modification time and size (and, with verifyHash, its SHA-256
+hash) still match. Snapshots are pickles, so only use this with
+snapshot files you trust.
+If intern is True, repeated city, state and category strings are
+interned so that every business shares one copy of each (see
+INTERNED_FIELDS).'''
+    hook = _internPairs if intern else None
+    if not cache:
+        with open(filename, 'r') as f:
+            return json.load(f, object_pairs_hook=hook)
+    snapshotFilename = filename + SNAPSHOT_SUFFIX
+    header = _sourceHeader(filename, verifyHash)
+    header['interned'] = intern
+    try:
+        with open(snapshotFilename, 'rb') as f:
+            if _headerMatches(pickle.load(f), header):
+                return pickle.load(f)
+    except Exception:
+        # A missing, truncated or corrupt snapshot can fail to unpickle in
+        # many ways (including AttributeError or ImportError for unknown
+        # globals); any of them just means re-parsing the JSON
+        pass
+    with open(filename, 'r') as f:
+        yelpDict = json.load(f, object_pairs_hook=hook)
+    if not verifyHash:
+        header['sha256'] = _fileHash(filename)
+    _writeSnapshot(snapshotFilename, header, yelpDict)
+    return yelpDict
+
+def _internPairs(pairs):
+    '''object_pairs_hook for json that builds a dictionary with the values
+of INTERNED_FIELDS interned (keys are left alone: business IDs never
+repeat, and json already shares repeated keys within one parse)'''
+    result = {}
+    for key, value in pairs:
+        if key in INTERNED_FIELDS:
+            if isinstance(value, str):
+                value = sys.intern(value)
+            elif isinstance(value, list):
+                value = [
+                    sys.intern(item) if isinstance(item, str) else item
+                    for item in value
+                ]
+        result[key] = value
+    return result
+
+def _fileHash(filename):
+    '''returns the SHA-256 hex digest of a file's contents'''
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _sourceHeader(filename, withHash):
+    '''returns the snapshot header describing the current source file'''
+    stat = os.stat(filename)
+    return {
+        'version': SNAPSHOT_VERSION,
+        'mtime': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': _fileHash(filename) if withHash else None,
+    }
+
+def _headerMatches(stored, current):
+    '''checks whether a stored snapshot header is still valid for the
+current source file; hashes are only compared when current has one'''
+    if not isinstance(stored, dict):
+        return False
+    for key in ('version', 'mtime', 'size', 'interned'):
+        if stored.get(key) != current[key]:
+            return False
+    if current['sha256'] is None:
+        return True
+    return stored.get('sha256') == current['sha256']
+
+def _writeSnapshot(snapshotFilename, header, yelpDict):
+    '''writes a snapshot (header, then data) atomically; failing to write
+one (e.g. in a read-only directory) is not an error'''
+    tempFilename = f'{snapshotFilename}.{os.getpid()}.tmp'
+    try:
+        with open(tempFilename, 'wb') as f:
+            pickle.dump(header, f, protocol=5)
+            pickle.dump(yelpDict, f, protocol=5)
+        os.replace(tempFilename, snapshotFilename)
+    except OSError:
+        if os.path.exists(tempFilename):
+            os.remove(tempFilename)
+
+def streamData(filename, chunkSize=STREAM_CHUNK_SIZE):
+    '''yields (bizID, business) pairs one at a time from a JSON file whose
+top-level value is an object keyed by business ID, without ever holding
+more than one business (plus one chunk of text) in memory'''
+    decoder = json.JSONDecoder()
     with open(filename, 'r') as f:
-        return json.load(f)
-    
-def getBusinessCount(yelpDict, businessName):
+        buffer = ''
+        pos = 0
+        eof = False
+
+        def fill():
+            '''reads another chunk, dropping text that was already consumed'''
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunkSize)
+            if chunk == '':
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        def skipSpace():
+            '''advances pos to the next non-whitespace character'''
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\n\r':
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                fill()
+
+        def expect(chars):
+            '''consumes and returns one of the given punctuation characters'''
+            nonlocal pos
+            skipSpace()
+            if pos >= len(buffer) or buffer[pos] not in chars:
+                raise ValueError(
+                    f"Malformed Yelp data in {filename!r}: expected one of"
+                    f" {chars!r}"
+                )
+            pos += 1
+            return buffer[pos - 1]
+
+        def decode():
+            '''decodes the next complete JSON value, reading more as needed'''
+            nonlocal pos
+            skipSpace()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()
+                    continue
+                # A number (or other bare value) that isn't followed by a
+                # delimiter might continue in the next chunk, e.g. '1.'
+                # then '5', so only accept it once a delimiter is read.
+                if (
+                    not eof
+                    and not isinstance(value, (dict, list, str))
+                    and (end == len(buffer) or buffer[end] not in ' \t\n\r,}')
+                ):
+                    fill()
+                    continue
+                pos = end
+                return value
+
+        expect('{')
+        skipSpace()
+        if pos < len(buffer) and buffer[pos] == '}':
+            return
+        while True:
+            bizID = decode()
+            expect(':')
+            yield bizID, decode()
+            if expect(',}') == '}':
+                return
+
+def streamDataLines(filename):
+    '''yields (bizID, business) pairs from a JSON-Lines file with one
+business object per line, as in the original Yelp dataset dump; the
+business ID is taken from (and removed from) each object's
+'business_id' field, so businesses have the same shape as loadData gives'''
+    with open(filename, 'r') as f:
+        for line in f:
+            if line.strip() == '':
+                continue
+            bus = json.loads(line)
+            yield bus.pop('business_id'), bus
+
+def _pairs(yelpData):
+    '''yields (bizID, business) pairs from either a Yelp dictionary or an
+iterable of such pairs'''
+    if hasattr(yelpData, 'items'):
+        yield from yelpData.items()
+    else:
+        yield from yelpData
+
+def _businesses(yelpData):
+    '''yields each business in either a Yelp dictionary or an iterable of
+(bizID, business) pairs such as streamData produces'''
+    if hasattr(yelpData, 'values'):
+        yield from yelpData.values()
+    else:
+        for _, bus in yelpData:
+            yield bus
+
+class Business(Mapping):
+    '''a compact, slotted record holding one business's seven fields, with
+categories stored as a tuple; much smaller than the dictionary loadData
+creates for each business. Fields can be read with either
+bus.name or bus['name'] (or bus.get('name')), and a Business is a
+read-only Mapping of its fields, so every function here accepts a
+dictionary of Business records in place of business dictionaries. A
+Business is equal to the dictionary it was made from, and bus.toDict()
+gives that dictionary back.'''
+    __slots__ = BUSINESS_FIELDS
+
+    def __init__(
+        self, state, address, review_count, stars, name, city, categories
+    ):
+        self.state = state
+        self.address = address
+        self.review_count = review_count
+        self.stars = stars
+        self.name = name
+        self.city = city
+        self.categories = tuple(categories)
+
+    @classmethod
+    def fromDict(cls, bus):
+        '''makes a Business from a business dictionary'''
+        return cls(*(bus[field] for field in BUSINESS_FIELDS))
+
+    def toDict(self):
+        '''returns the business dictionary this record stands for'''
+        result = {field: getattr(self, field) for field in BUSINESS_FIELDS}
+        result['categories'] = list(self.categories)
+        return result
+
+    def keys(self):
+        return BUSINESS_FIELDS
+
+    def __getitem__(self, field):
+        if field not in BUSINESS_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __contains__(self, field):
+        return field in BUSINESS_FIELDS
+
+    def __iter__(self):
+        return iter(BUSINESS_FIELDS)
+
+    def __len__(self):
+        return len(BUSINESS_FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, Business):
+            return all(
+                getattr(self, field) == getattr(other, field)
+                for field in BUSINESS_FIELDS
+            )
+        elif isinstance(other, dict):
+            return self.toDict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(
+            f'{field}={getattr(self, field)!r}' for field in BUSINESS_FIELDS
+        )
+        return f'Business({fields})'
+
+def asRecords(yelpData):
+    '''returns a Yelp dictionary whose values are Business records, from a
+Yelp dictionary or a stream of pairs (e.g. asRecords(streamData(f))
+never holds more than one business dictionary at a time)'''
+    return {bizID: Business.fromDict(bus) for bizID, bus in _pairs(yelpData)}
+
+def _jsonDefault(value):
+    '''lets json encode Business records as business dictionaries'''
+    if isinstance(value, Business):
+        return value.toDict()
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable"
+    )
+
+def leaderKey(bus):
+    '''the key bestInCategory ranks businesses by: stars, then reviews'''
+    return (bus['stars'], bus['review_count'])
+
+class YelpIndex:
+    '''secondary indexes over a loaded Yelp dictionary, built once so that
+repeated queries only look at matching businesses; pass one as the
+`index` argument of the query functions below. byCity and byCategory
+map each city and category to the IDs of businesses that have it
+(stored as dictionary keys, so they can be added and removed cheaply).
+leaders maps each category to a [key, bizIDs] pair holding the best
+(stars, review_count) key in that category and the IDs that share it.
+positions gives each business's place in the dictionary's order.
+Use upsert and delete to change businesses so that the indexes are
+updated along with the dictionary (a business may be edited in place
+and then upserted), or call invalidate after changing the dictionary
+directly; each change (and each call to invalidate)
+increases version, which QueryCache uses to spot changes.'''
+    def __init__(self, yelpDict):
+        self.yelpDict = yelpDict
+        self.version = 0
+        self._index()
+
+    def _index(self):
+        '''builds every index from scratch from the dictionary as it is now'''
+        self.byCity = {}
+        self.byCategory = {}
+        self.leaders = {}
+        # category -> (sorted leaderKeys found there, and for each of them
+        # a bucket of (position, bizID) entries sorted by position)
+        self._ranked = {}
+        # bizID -> the record (see _record) each business was indexed by
+        self._indexed = {}
+        self.positions = {}
+        self._nextPosition = 0
+        # Lookups built on first use, by name
+        self._lazy = {}
+        for bizID, bus in self.yelpDict.items():
+            self.positions[bizID] = self._nextPosition
+            self._nextPosition += 1
+            self._add(bizID, self._record(bus))
+
+    @staticmethod
+    def _record(bus):
+        '''returns what the indexes hold about a business: its city, a tuple
+of its categories, its leaderKey, and its casefolded name. Businesses
+are removed from the indexes using the record they were added with, so
+a business dictionary may be changed in place before being upserted.'''
+        return (
+            bus['city'],
+            tuple(bus['categories']),
+            leaderKey(bus),
+            bus['name'].casefold()
+        )
+
+    def _add(self, bizID, record):
+        '''adds a business that is in the dictionary to the eager indexes'''
+        city, categories, key, _ = record
+        self._indexed[bizID] = record
+        self.byCity.setdefault(city, {})[bizID] = None
+        entry = (self.positions[bizID], bizID)
+        for category in categories:
+            self.byCategory.setdefault(category, {})[bizID] = None
+            keys, buckets = self._ranked.setdefault(category, ([], []))
+            place = bisect.bisect_left(keys, key)
+            if place == len(keys) or keys[place] != key:
+                keys.insert(place, key)
+                buckets.insert(place, [])
+            bisect.insort(buckets[place], entry)
+            if place == len(keys) - 1:
+                self._setLeader(category)
+
+    def _remove(self, bizID, record):
+        '''removes a business from the eager indexes'''
+        city, categories, key, _ = record
+        del self._indexed[bizID]
+        inCity = self.byCity[city]
+        del inCity[bizID]
+        if not inCity:
+            del self.byCity[city]
+        entry = (self.positions[bizID], bizID)
+        for category in categories:
+            inCategory = self.byCategory[category]
+            del inCategory[bizID]
+            if not inCategory:
+                del self.byCategory[category]
+                del self.leaders[category]
+                del self._ranked[category]
+                continue
+            keys, buckets = self._ranked[category]
+            place = bisect.bisect_left(keys, key)
+            wasLeader = place == len(keys) - 1
+            bucket = buckets[place]
+            del bucket[bisect.bisect_left(bucket, entry)]
+            if not bucket:
+                del keys[place]
+                del buckets[place]
+            if wasLeader:
+                self._setLeader(category)
+
+    def _setLeader(self, category):
+        '''sets one category's leaderboard entry from its top-ranked bucket,
+without looking at any other business in the category'''
+        keys, buckets = self._ranked[category]
+        self.leaders[category] = [
+            keys[-1],
+            [bizID for _, bizID in buckets[-1]]
+        ]
+
+    def upsert(self, bizID, bus):
+        '''adds a business to the dictionary, or replaces the business with
+that ID (which keeps its place in the dictionary), updating every index
+in time proportional to the business's size rather than the data's.
+bus may be the dictionary's own business dictionary, changed in place;
+if it is missing a field, KeyError is raised and nothing is changed.'''
+        record = self._record(bus)
+        old = self._indexed.get(bizID)
+        if old is not None:
+            self._unbuild(bizID, old)
+            self._remove(bizID, old)
+        else:
+            self.positions[bizID] = self._nextPosition
+            self._nextPosition += 1
+        self.yelpDict[bizID] = bus
+        self._add(bizID, record)
+        self._rebuild(bizID, record)
+        self.version += 1
+
+    def delete(self, bizID):
+        '''removes the business with the given ID from the dictionary and
+every index; raises KeyError if there is no such business'''
+        old = self._indexed[bizID]
+        del self.yelpDict[bizID]
+        self._unbuild(bizID, old)
+        self._remove(bizID, old)
+        del self.positions[bizID]
+        self.version += 1
+
+    def _rebuild(self, bizID, record):
+        '''adds a business to whichever lazy lookups have been built'''
+        city, categories, (stars, reviews), name = record
+        if 'nameCounts' in self._lazy:
+            self._lazy['nameCounts'][name] += 1
+        if 'ranges' in self._lazy:
+            ranges = self._lazy['ranges']
+            entry = (reviews, self.positions[bizID], bizID)
+            for category in categories:
+                starValues, buckets = ranges.setdefault(
+                    (city, category),
+                    ([], [])
+                )
+                place = bisect.bisect_left(starValues, stars)
+                if place == len(starValues) or starValues[place] != stars:
+                    starValues.insert(place, stars)
+                    buckets.insert(place, [])
+                bisect.insort(buckets[place], entry)
+
+    def _unbuild(self, bizID, record):
+        '''removes a business from whichever lazy lookups have been built'''
+        city, categories, (stars, reviews), name = record
+        if 'nameCounts' in self._lazy:
+            counts = self._lazy['nameCounts']
+            counts[name] -= 1
+            if counts[name] <= 0:
+                del counts[name]
+        if 'ranges' in self._lazy:
+            ranges = self._lazy['ranges']
+            entry = (reviews, self.positions[bizID], bizID)
+            for category in categories:
+                key = (city, category)
+                starValues, buckets = ranges[key]
+                place = bisect.bisect_left(starValues, stars)
+                bucket = buckets[place]
+                del bucket[bisect.bisect_left(bucket, entry)]
+                if not bucket:
+                    del starValues[place]
+                    del buckets[place]
+                    if not starValues:
+                        del ranges[key]
+
+    def _built(self, name, build):
+        '''returns the lazily built lookup with the given name, calling build
+to make it on first use. Lookups are built from the indexed records, so
+they agree with the eager indexes; if businesses have been added to or
+removed from the dictionary directly, every index is rebuilt first (but
+call invalidate after changing businesses in place).'''
+        if len(self._indexed) != len(self.yelpDict):
+            self._index()
+        lookup = self._lazy.get(name)
+        if lookup is None:
+            lookup = build()
+            self._lazy[name] = lookup
+        return lookup
+
+    def nameCounts(self):
+        '''returns a dictionary mapping each casefolded business name to how
+many businesses have it (built on first use)'''
+        return self._built('nameCounts', lambda: Counter(
+            name for *_, name in self._indexed.values()
+        ))
+
+    def ranges(self):
+        '''returns the range index used for threshold queries (built on first
+use). It maps each (city, category) pair to a sorted list of the star
+values found there and, for each of those values, a bucket of
+(review_count, position, bizID) entries sorted by review count.'''
+        return self._built('ranges', self._buildRanges)
+
+    def _buildRanges(self):
+        '''builds the structure described in ranges'''
+        buckets = {}
+        for bizID, record in self._indexed.items():
+            city, categories, (stars, reviews), _ = record
+            entry = (reviews, self.positions[bizID], bizID)
+            for category in categories:
+                byStars = buckets.setdefault((city, category), {})
+                byStars.setdefault(stars, []).append(entry)
+        ranges = {}
+        for key, byStars in buckets.items():
+            starValues = sorted(byStars)
+            ranges[key] = (
+                starValues,
+                [sorted(byStars[stars]) for stars in starValues]
+            )
+        return ranges
+
+    def thresholdMatches(self, category, city, starLimit, minReview):
+        '''returns the IDs of businesses with the given category and city
+whose stars and review_count are at least starLimit and minReview, in
+dictionary order, using bisection on the range index'''
+        found = self.ranges().get((city, category))
+        if found is None:
+            return []
+        starValues, buckets = found
+        matches = []
+        for bucket in buckets[bisect.bisect_left(starValues, starLimit):]:
+            first = bisect.bisect_left(bucket, (minReview,))
+            matches.extend(bucket[first:])
+        matches.sort(key=lambda entry: entry[1])
+        return [bizID for _, _, bizID in matches]
+
+    def invalidate(self):
+        '''rebuilds every index from the dictionary, for use after changing
+businesses in it directly rather than through upsert and delete; lazily
+built lookups are discarded and rebuilt on next use'''
+        self._index()
+        self.version += 1
+
+class QueryCache:
+    '''remembers the results of queries against the dictionary behind a
+YelpIndex, so asking the same question twice only computes the answer
+once. Results are keyed on the index's version and the query's
+arguments, and are all dropped as soon as the version changes (i.e.
+after upsert, delete or invalidate on the index). At most maxEntries
+results are kept, evicting the least recently used ones first, and
+results with more than maxResultSize items are never kept. Each method
+answers the query function of the same name (without the yelpDict and
+index arguments) and returns a fresh copy of the remembered result.'''
+    def __init__(self, index, maxEntries=QUERY_CACHE_ENTRIES,
+                 maxResultSize=None):
+        self.index = index
+        self.maxEntries = maxEntries
+        self.maxResultSize = maxResultSize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._version = index.version
+
+    def clear(self):
+        '''forgets every remembered result'''
+        self._results.clear()
+
+    def _answer(self, function, **arguments):
+        '''returns a copy of function's result for the given arguments,
+computing and remembering it if necessary'''
+        if self._version != self.index.version:
+            self.clear()
+            self._version = self.index.version
+        key = (self._version, function.__name__, tuple(arguments.items()))
+        if key in self._results:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return copy.copy(self._results[key])
+        self.misses += 1
+        result = function(self.index.yelpDict, index=self.index, **arguments)
+        if self.maxResultSize is None or (
+            not hasattr(result, '__len__')
+            or len(result) <= self.maxResultSize
+        ):
+            self._results[key] = result
+            while len(self._results) > self.maxEntries:
+                self._results.popitem(last=False)
+        return copy.copy(result)
+
+    def getBusinessCount(self, businessName):
+        return self._answer(getBusinessCount, businessName=businessName)
+
+    def uniqueCities(self, collation=None):
+        return self._answer(uniqueCities, collation=collation)
+
+    def selectBusinesses(self, category, city, starLimit, minReview,
+                         limit=None):
+        return self._answer(
+            selectBusinesses,
+            category=category,
+            city=city,
+            starLimit=starLimit,
+            minReview=minReview,
+            limit=limit
+        )
+
+    def findCategories(self, threshold):
+        return self._answer(findCategories, threshold=threshold)
+
+    def bestInCategory(self, category):
+        return self._answer(bestInCategory, category=category)
+
+    def bestPizzaPlace(self):
+        return self._answer(bestPizzaPlace)
+
+class ColumnarStore(Mapping):
+    '''a column-oriented, read-only copy of a Yelp dictionary that
+findBusinesses and findCategories can filter with vectorized NumPy
+masks instead of testing one dictionary per business. stars and
+review_count are NumPy arrays, city and state are stored as small
+integer codes into cityNames and stateNames, and categories are stored
+CSR-style: row i has the category codes
+categoryCodes[categoryStarts[i]:categoryStarts[i + 1]]. It still acts
+as a mapping from business ID to business dictionary, so the other
+functions here accept it too (rebuilding each dictionary on access).'''
+    def __init__(self, yelpDict):
+        if np is None:
+            raise ImportError("ColumnarStore requires NumPy")
+        self.ids = list(yelpDict)
+        self.rows = {bizID: row for row, bizID in enumerate(self.ids)}
+        self.names = []
+        self.addresses = []
+        self.cityNames = []
+        self.stateNames = []
+        self.categoryNames = []
+        self.cityCodeOf = {}
+        self.categoryCodeOf = {}
+        stateCodes = {}
+        cities = []
+        states = []
+        categoryStarts = [0]
+        categoryCodes = []
+        stars = []
+        reviews = []
+        for bus in yelpDict.values():
+            self.names.append(bus['name'])
+            self.addresses.append(bus['address'])
+            stars.append(bus['stars'])
+            reviews.append(bus['review_count'])
+            cities.append(
+                self._code(bus['city'], self.cityCodeOf, self.cityNames)
+            )
+            states.append(
+                self._code(bus['state'], stateCodes, self.stateNames)
+            )
+            for category in bus['categories']:
+                categoryCodes.append(self._code(
+                    category,
+                    self.categoryCodeOf,
+                    self.categoryNames
+                ))
+            categoryStarts.append(len(categoryCodes))
+        self.stars = np.array(stars, dtype=np.float64)
+        self.reviewCounts = np.array(reviews, dtype=np.int64)
+        self.cities = np.array(cities, dtype=np.int32)
+        self.states = np.array(states, dtype=np.int32)
+        self.categoryStarts = np.array(categoryStarts, dtype=np.int64)
+        self.categoryCodes = np.array(categoryCodes, dtype=np.int32)
+        # The row each entry of categoryCodes belongs to, so membership
+        # of a single category can be computed with one mask
+        self.categoryRows = np.repeat(
+            np.arange(len(self.ids), dtype=np.int64),
+            np.diff(self.categoryStarts)
+        )
+
+    @staticmethod
+    def _code(value, codes, values):
+        '''returns the integer code for value, assigning a new one if needed'''
+        code = codes.get(value)
+        if code is None:
+            code = len(values)
+            codes[value] = code
+            values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __getitem__(self, bizID):
+        return self.business(self.rows[bizID])
+
+    def business(self, row):
+        '''rebuilds the business dictionary stored at the given row'''
+        start = self.categoryStarts[row]
+        end = self.categoryStarts[row + 1]
+        return {
+            'state': self.stateNames[self.states[row]],
+            'address': self.addresses[row],
+            'review_count': int(self.reviewCounts[row]),
+            'stars': float(self.stars[row]),
+            'name': self.names[row],
+            'city': self.cityNames[self.cities[row]],
+            'categories': [
+                self.categoryNames[code]
+                for code in self.categoryCodes[start:end]
+            ],
+        }
+
+    def matching(self, category, city, starLimit, minReview):
+        '''returns the businesses findBusinesses would select, in row order'''
+        cityCode = self.cityCodeOf.get(city)
+        categoryCode = self.categoryCodeOf.get(category)
+        if cityCode is None or categoryCode is None:
+            return []
+        inCategory = np.zeros(len(self.ids), dtype=bool)
+        inCategory[
+            self.categoryRows[self.categoryCodes == categoryCode]
+        ] = True
+        mask = (
+            inCategory
+            & (self.cities == cityCode)
+            & (self.stars >= starLimit)
+            & (self.reviewCounts >= minReview)
+        )
+        return [self.business(row) for row in np.flatnonzero(mask)]
+
+    def categoryCounts(self):
+        '''returns a dictionary of category counts in first-seen order'''
+        counts = np.bincount(
+            self.categoryCodes,
+            minlength=len(self.categoryNames)
+        )
+        return {
+            name: int(count)
+            for name, count in zip(self.categoryNames, counts)
+        }
+
+def writeMappedStore(yelpDict, filename):
+    '''writes a Yelp dictionary (or stream of pairs) to filename in the
+read-only binary format MappedStore opens. All columns are fixed-width
+arrays in native byte order, laid out one after another after a header
+(see MAPPED_HEADER):
+    stars           float64 per business
+    review_count    int64 per business
+    categoryStarts  uint64 per business plus one; business i's
+                    categories are categoryRefs[start[i]:start[i + 1]]
+    stringStarts    uint64 per string plus one, offsets into the blob
+    fields          uint32 string numbers: ID, name, address, city and
+                    state for each business
+    categoryRefs    uint32 string number per category entry
+    idOrder         uint32 business rows sorted by ID
+    stringOrder     uint32 string numbers sorted by value
+    blob            all distinct strings, UTF-8 encoded
+Each distinct string is stored once.'''
+    strings = {}
+    stars = array.array('d')
+    reviews = array.array('q')
+    categoryStarts = array.array('Q', [0])
+    fields = array.array('I')
+    categoryRefs = array.array('I')
+    ids = []
+
+    def ref(value):
+        '''returns the string number for value, adding it if needed'''
+        number = strings.get(value)
+        if number is None:
+            number = len(strings)
+            strings[value] = number
+        return number
+
+    for bizID, bus in _pairs(yelpDict):
+        ids.append(bizID)
+        stars.append(bus['stars'])
+        reviews.append(bus['review_count'])
+        for field in (bizID, bus['name'], bus['address'], bus['city'],
+                      bus['state']):
+            fields.append(ref(field))
+        for category in bus['categories']:
+            categoryRefs.append(ref(category))
+        categoryStarts.append(len(categoryRefs))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    stringStarts = array.array('Q', [0])
+    for data in encoded:
+        stringStarts.append(stringStarts[-1] + len(data))
+    idOrder = array.array(
+        'I',
+        sorted(range(len(ids)), key=ids.__getitem__)
+    )
+    stringOrder = array.array(
+        'I',
+        sorted(range(len(encoded)), key=encoded.__getitem__)
+    )
+
+    tempFilename = f'{filename}.{os.getpid()}.tmp'
+    try:
+        with open(tempFilename, 'wb') as f:
+            f.write(MAPPED_HEADER.pack(
+                MAPPED_MAGIC,
+                sys.byteorder == 'little',
+                len(ids),
+                len(categoryRefs),
+                len(encoded)
+            ))
+            for column in (
+                stars, reviews, categoryStarts, stringStarts, fields,
+                categoryRefs, idOrder, stringOrder
+            ):
+                column.tofile(f)
+            for data in encoded:
+                f.write(data)
+        os.replace(tempFilename, filename)
+    except BaseException:
+        if os.path.exists(tempFilename):
+            os.remove(tempFilename)
+        raise
+
+class _RowValues(ValuesView):
+    '''values view of a MappedStore that reads rows in file order'''
+    def __iter__(self):
+        for row in range(len(self._mapping)):
+            yield self._mapping.business(row)
+
+class _RowItems(ItemsView):
+    '''items view of a MappedStore that reads rows in file order'''
+    def __iter__(self):
+        for row in range(len(self._mapping)):
+            yield self._mapping.bizID(row), self._mapping.business(row)
+
+class MappedStore(Mapping):
+    '''a read-only Yelp dictionary backed by a memory-mapped file written by
+writeMappedStore. Nothing is copied onto the heap when it is opened:
+business dictionaries are decoded from the mapped pages as they are
+accessed, so any number of processes that open the same file share one
+copy of it in the operating system's page cache. It acts as a mapping
+from business ID to business dictionary (in the original order), and
+findBusinesses and findCategories work directly on its columns.'''
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, little, count, refCount, stringCount = MAPPED_HEADER.unpack(
+            self._mmap[:MAPPED_HEADER.size]
+        )
+        if magic != MAPPED_MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{filename!r} is not a mapped Yelp store")
+        if little != (sys.byteorder == 'little'):
+            self._mmap.close()
+            raise ValueError(
+                f"{filename!r} was written on a machine with a different"
+                f" byte order"
+            )
+        self._count = count
+        view = self._view = memoryview(self._mmap)
+        offset = MAPPED_HEADER.size
+
+        def column(format, length):
+            '''returns the next column of the file as a typed memoryview'''
+            nonlocal offset
+            size = struct.calcsize(format) * length
+            result = view[offset:offset + size].cast(format)
+            offset += size
+            return result
+
+        self.stars = column('d', count)
+        self.reviewCounts = column('q', count)
+        self.categoryStarts = column('Q', count + 1)
+        self.stringStarts = column('Q', stringCount + 1)
+        self.fields = column('I', count * 5)
+        self.categoryRefs = column('I', refCount)
+        self.idOrder = column('I', count)
+        self.stringOrder = column('I', stringCount)
+        self._blob = offset
+
+    def close(self):
+        '''releases the memory map; the store can't be used afterwards'''
+        for name in (
+            'stars', 'reviewCounts', 'categoryStarts', 'stringStarts',
+            'fields', 'categoryRefs', 'idOrder', 'stringOrder'
+        ):
+            getattr(self, name).release()
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def string(self, number):
+        '''decodes string number from the string table'''
+        start = self._blob + self.stringStarts[number]
+        end = self._blob + self.stringStarts[number + 1]
+        return self._mmap[start:end].decode('utf-8')
+
+    def stringNumber(self, value):
+        '''returns the string number of value, or None if it isn't stored'''
+        target = value.encode('utf-8')
+        low, high = 0, len(self.stringOrder)
+        while low < high:
+            middle = (low + high) // 2
+            number = self.stringOrder[middle]
+            start = self._blob + self.stringStarts[number]
+            end = self._blob + self.stringStarts[number + 1]
+            if self._mmap[start:end] < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.stringOrder):
+            number = self.stringOrder[low]
+            if self.string(number) == value:
+                return number
+        return None
+
+    def bizID(self, row):
+        '''returns the business ID stored at the given row'''
+        return self.string(self.fields[row * 5])
+
+    def business(self, row):
+        '''decodes the business dictionary stored at the given row'''
+        _, name, address, city, state = self.fields[row * 5:row * 5 + 5]
+        start = self.categoryStarts[row]
+        end = self.categoryStarts[row + 1]
+        return {
+            'state': self.string(state),
+            'address': self.string(address),
+            'review_count': self.reviewCounts[row],
+            'stars': self.stars[row],
+            'name': self.string(name),
+            'city': self.string(city),
+            'categories': [
+                self.string(number)
+                for number in self.categoryRefs[start:end]
+            ],
+        }
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for row in range(self._count):
+            yield self.bizID(row)
+
+    def __getitem__(self, bizID):
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.bizID(self.idOrder[middle]) < bizID:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count:
+            row = self.idOrder[low]
+            if self.bizID(row) == bizID:
+                return self.business(row)
+        raise KeyError(bizID)
+
+    def values(self):
+        return _RowValues(self)
+
+    def items(self):
+        return _RowItems(self)
+
+    def matching(self, category, city, starLimit, minReview):
+        '''returns the businesses findBusinesses would select, in row order,
+comparing string numbers so only matching rows are decoded'''
+        cityNumber = self.stringNumber(city)
+        categoryNumber = self.stringNumber(category)
+        if cityNumber is None or categoryNumber is None:
+            return []
+        fields = self.fields
+        starts = self.categoryStarts
+        refs = self.categoryRefs
+        result = []
+        for row in range(self._count):
+            if (
+                fields[row * 5 + 3] == cityNumber
+                and self.stars[row] >= starLimit
+                and self.reviewCounts[row] >= minReview
+                and categoryNumber in refs[starts[row]:starts[row + 1]]
+            ):
+                result.append(self.business(row))
+        return result
+
+    def categoryCounts(self):
+        '''returns a dictionary of category counts in first-seen order'''
+        counts = Counter(self.categoryRefs)
+        return {
+            self.string(number): count
+            for number, count in counts.items()
+        }
+
+def getBusinessCount(yelpDict, businessName, index=None):
     '''returns an integer count of businesses with businessName in the given Yelp dictionary yelpDict'''
+    name = businessName.casefold()
+    if index is not None:
+        return index.nameCounts()[name]
     count = 0
-    for bizID in yelpDict:
-        if yelpDict[bizID]['name'].lower() == businessName.lower():
+    for bus in _businesses(yelpDict):
+        if bus['name'].casefold() == name:
             count += 1
     return count
 
-def uniqueCities(yelpDict):
+def _collationKey(collation):
+    '''returns the sort key function for a uniqueCities collation mode'''
+    if collation is None:
+        return None
+    elif collation == 'casefold':
+        # Ties between spellings that only differ by case are broken by
+        # the plain ordering so results stay deterministic
+        return lambda city: (city.casefold(), city)
+    elif collation == 'locale':
+        return locale.strxfrm
+    else:
+        raise ValueError(
+            f"Unknown collation {collation!r}; expected None, 'casefold'"
+            f" or 'locale'"
+        )
+
+def uniqueCities(yelpDict, index=None, collation=None):
     '''takes a Yelp dictionary,
 and returns a list of all cities that appear in it, in alphabetical order,
-where each city appears only once in the list'''
-    result = []
-    for bizID in yelpDict:
-        if yelpDict[bizID]['city'] not in result:
-            result.append(yelpDict[bizID]['city'])
-    new = sorted(result)
+where each city appears only once in the list. collation may be
+'casefold' to ignore case when ordering, or 'locale' to order using the
+current LC_COLLATE locale setting.'''
+    key = _collationKey(collation)
+    if index is not None:
+        return sorted(index.byCity, key=key)
+    result = set()
+    for bus in _businesses(yelpDict):
+        result.add(bus['city'])
+    new = sorted(result, key=key)
     return new
 
 def SortByStar(bus):
     '''sort'''
     return (bus['stars'],bus['name'])
 
-def findBusinesses(yelpDict, category, city, starLimit, minReview, outFilename):
+def topByStar(businesses, limit):
+    '''returns the last limit entries of sorted(businesses, key=SortByStar)
+(the best-rated ones, still in ascending order) using a heap that never
+holds more than limit businesses'''
+    if limit <= 0:
+        return []
+    # The position breaks ties exactly as the stable sort would
+    best = heapq.nlargest(
+        limit,
+        enumerate(businesses),
+        key=lambda pair: (SortByStar(pair[1]), pair[0])
+    )
+    return [bus for _, bus in reversed(best)]
+
+def selectBusinesses(yelpDict, category, city, starLimit, minReview,
+                     limit=None, index=None):
+    '''returns the business dictionaries that findBusinesses would write,
+sorted by SortByStar; if limit is given, only the best limit of them
+are kept (see topByStar)'''
+    if isinstance(yelpDict, (ColumnarStore, MappedStore)):
+        candidates = yelpDict.matching(category, city, starLimit, minReview)
+    elif index is not None:
+        matches = index.thresholdMatches(category, city, starLimit, minReview)
+        candidates = (yelpDict[bizID] for bizID in matches)
+    else:
+        candidates = _businesses(yelpDict)
+    result = (
+        bus
+        for bus in candidates
+        if category in bus['categories']
+        and bus['city'] == city
+        and bus['stars'] >= starLimit
+        and bus['review_count'] >= minReview
+    )
+    if limit is not None:
+        return topByStar(result, limit)
+    return sorted(result,key=SortByStar)
+
+def writeBusinesses(businesses, outFilename, format='json'):
+    '''writes business dictionaries to outFilename one at a time as the
+iterable produces them, either as a JSON array (format 'json', the same
+text json.dump would write) or one per line (format 'jsonl'). Output
+goes to a temporary file which is renamed over outFilename only once
+everything has been written, so readers never see a partial file.'''
+    if format == 'json':
+        start, separator, end = '[', ', ', ']'
+    elif format == 'jsonl':
+        start, separator, end = '', '\n', '\n'
+    else:
+        raise ValueError(
+            f"Unknown output format {format!r}; expected 'json' or 'jsonl'"
+        )
+    encoder = json.JSONEncoder(default=_jsonDefault)
+    tempFilename = f'{outFilename}.{os.getpid()}.tmp'
+    try:
+        with open(tempFilename, 'w', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(start)
+            first = True
+            for bus in businesses:
+                if not first:
+                    f.write(separator)
+                first = False
+                for chunk in encoder.iterencode(bus):
+                    f.write(chunk)
+            if not first or format == 'json':
+                f.write(end)
+        os.replace(tempFilename, outFilename)
+    except BaseException:
+        if os.path.exists(tempFilename):
+            os.remove(tempFilename)
+        raise
+
+def findBusinesses(yelpDict, category, city, starLimit, minReview, outFilename,
+                   index=None, limit=None, format='json'):
     '''creates a list of business dictionaries with the given category,
 located in the given city,
 whose stars are at or exceeding the starLimit,
-and whose review_count is at or exceeding the minReviews.'''
-    result = []
-    for bizID in yelpDict:
-        if category in yelpDict[bizID]['categories']:
-            if yelpDict[bizID]['city'] == city:
-                if yelpDict[bizID]['stars'] >= starLimit:
-                    if yelpDict[bizID]['review_count'] >= minReview:
-                        result.append(yelpDict[bizID])
-    new = sorted(result,key=SortByStar)
-    with open(outFilename, 'w') as f:
-        json.dump(new,f)
+and whose review_count is at or exceeding the minReviews.
+If limit is given, only the best limit businesses are written; format
+may be 'jsonl' to write one business per line (see writeBusinesses).'''
+    new = selectBusinesses(
+        yelpDict, category, city, starLimit, minReview,
+        limit=limit, index=index
+    )
+    writeBusinesses(new, outFilename, format)
         
-def findCategories(yelpDict,threshold):
-    '''Only categories whose total count meets or exceeds the given threshold should be included in the resulting dictionary.'''
-    AllCategories = {}
-    for bizID in yelpDict:
-        for category in yelpDict[bizID]['categories']:
-            if category not in AllCategories:
-                AllCategories[category] = 1
-            else:
-                AllCategories[category] += 1
+def findBusinessesBatch(yelpDict, queries, format='json'):
+    '''answers many findBusinesses queries with a single pass over yelpDict
+(which may also be a stream of pairs, see streamData). Each query is a
+(category, city, starLimit, minReview, outFilename) tuple, i.e. the
+arguments findBusinesses takes, and each query's file is written just
+as findBusinesses would write it.'''
+    queries = list(queries)
+    # Each business only needs to be tested against queries for its city
+    queriesByCity = {}
+    for position, query in enumerate(queries):
+        queriesByCity.setdefault(query[1], []).append((position, query))
+    matches = [[] for _ in queries]
+    for bus in _businesses(yelpDict):
+        for position, query in queriesByCity.get(bus['city'], []):
+            category, _, starLimit, minReview, _ = query
+            if (
+                category in bus['categories']
+                and bus['stars'] >= starLimit
+                and bus['review_count'] >= minReview
+            ):
+                matches[position].append(bus)
+    for query, found in zip(queries, matches):
+        writeBusinesses(sorted(found, key=SortByStar), query[4], format)
+
+_countingRows = None
+"""
+The businesses being counted, as a list, in a worker process started by
+`_countCategoriesParallel` (set there by `_setCountingRows`, so that
+only row ranges, and not the businesses themselves, are sent to it).
+"""
+
+def _setCountingRows(rows):
+    '''worker initializer for _countCategoriesParallel; with fork, rows is
+inherited from the parent rather than pickled'''
+    global _countingRows
+    _countingRows = rows
+
+def _countCategories(bounds):
+    '''counts categories across the businesses in one (start, stop) range
+of _countingRows; runs in worker processes for findCategories'''
+    start, stop = bounds
+    return Counter(itertools.chain.from_iterable(
+        bus['categories'] for bus in itertools.islice(
+            _countingRows, start, stop
+        )
+    ))
+
+def _countCategoriesParallel(yelpDict, workers):
+    '''counts categories by splitting the businesses into one contiguous
+range of rows per worker process and merging the partial counts in
+range order, which keeps categories in the order they are first seen.
+Workers are forked so that they inherit the businesses; where fork isn't
+the platform's default start method (e.g. on macOS and Windows), this
+returns None and the caller counts serially instead.'''
+    if multiprocessing.get_start_method() != 'fork':
+        return None
+    rows = list(_businesses(yelpDict))
+    shardSize = max(1, -(-len(rows) // workers))
+    bounds = [
+        (start, min(start + shardSize, len(rows)))
+        for start in range(0, len(rows), shardSize)
+    ]
+    AllCategories = Counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=_setCountingRows,
+        initargs=(rows,)
+    ) as pool:
+        for partial in pool.map(_countCategories, bounds):
+            AllCategories.update(partial)
+    return AllCategories
+
+def findCategories(yelpDict,threshold, index=None, workers=None):
+    '''Only categories whose total count meets or exceeds the given threshold should be included in the resulting dictionary.
+If workers is more than 1, counting is split across that many processes.'''
+    AllCategories = None
+    if isinstance(yelpDict, (ColumnarStore, MappedStore)):
+        AllCategories = yelpDict.categoryCounts()
+    elif index is not None:
+        AllCategories = {}
+        for category, bizIDs in index.byCategory.items():
+            AllCategories[category] = len(bizIDs)
+    elif workers is not None and workers > 1:
+        AllCategories = _countCategoriesParallel(yelpDict, workers)
+    if AllCategories is None:
+        AllCategories = {}
+        for bus in _businesses(yelpDict):
+            for category in bus['categories']:
+                if category not in AllCategories:
+                    AllCategories[category] = 1
+                else:
+                    AllCategories[category] += 1
     SortedCategories = {}
     for item in AllCategories.items():
         if item[1] >= threshold:
            SortedCategories[item[0]] = item[1]
     return SortedCategories
 
-def bestPizzaPlace(yelpDict):
-    '''returns a list containing one or more business dictionaries from the given yelpDict with 'Pizza' as a category that have the highest star rating'''
+def bestInCategory(yelpDict, category, index=None):
+    '''returns a list containing one or more business dictionaries from the
+given yelpDict with the given category that have the highest star
+rating, breaking ties by review_count (businesses tied on both are all
+included). With an index this is a single leaderboard lookup.'''
+    if index is not None:
+        leader = index.leaders.get(category)
+        if leader is None:
+            return []
+        return [yelpDict[bizID] for bizID in leader[1]]
     result = []
     maxStar = 0
     maxReview =  0
-    for bizID in yelpDict:
-        if 'Pizza' in yelpDict[bizID]['categories']:
-            bus = yelpDict[bizID]
+    for bus in _businesses(yelpDict):
+        if category in bus['categories']:
             if bus['stars'] == maxStar:
                 if bus['review_count'] == maxReview:
                     result.append(bus)
@@ -96,6 +1338,32 @@ def bestPizzaPlace(yelpDict):
                 maxStar =  bus['stars']
                 maxReview =  bus['review_count']
     return result
+
+def bestPizzaPlace(yelpDict, index=None):
+    '''returns a list containing one or more business dictionaries from the given yelpDict with 'Pizza' as a category that have the highest star rating'''
+    return bestInCategory(yelpDict, 'Pizza', index)
+
+QUERIES = {
+    function.__name__: function
+    for function in (
+        getBusinessCount, uniqueCities, selectBusinesses, findBusinesses,
+        findCategories, bestInCategory, bestPizzaPlace
+    )
+}
+"""
+The query functions that `runQuery` can run, by name.
+"""
+
+def runQuery(yelpDict, name, args=(), kwargs=None, index=None):
+    '''runs the query function with the given name (see QUERIES) against
+yelpDict with the given extra arguments, using index if one is given'''
+    function = QUERIES.get(name)
+    if function is None:
+        raise ValueError(f"Unknown query {name!r}")
+    kwargs = dict(kwargs or {})
+    if index is not None:
+        kwargs.setdefault('index', index)
+    return function(yelpDict, *args, **kwargs)
         
         
 
@@ -124,3 +1392,167 @@ microYelp = {
   "4SBY4CHiMD8YOCEU9_fdnw": {'state': 'ON', 'address': '123 Queen Street W', 'review_count': 3, 'stars': 4.0, 'name': 'Fidora Salon and Spa', 'city': 'Toronto', 'categories': ['Day Spas', 'Hair Salons', 'Beauty & Spas']},
   "6aFAEeJ3nS-iWGt7Tn7S0Q": {'state': 'NC', 'address': '19925 Jetton Rd, Ste 100', 'review_count': 5, 'stars': 5.0, 'name': 'KS Audio Video', 'city': 'Cornelius', 'categories': ['Home Services', 'Television Service Providers', 'Home Automation', 'Home Theatre Installation', 'Professional Services']},
 }
+
+#--------------#
+# Command line #
+#--------------#
+
+_cliData = None
+"""
+The dataset loaded by `main`, shared with (forked) worker processes.
+"""
+
+def _loadCliData(filename, cache, intern, withIndex):
+    '''loads the dataset for main and builds its index if asked to'''
+    global _cliData
+    yelpDict = loadData(filename, cache=cache, intern=intern)
+    _cliData = (yelpDict, YelpIndex(yelpDict) if withIndex else None)
+
+def _initCliWorker(filename, cache, intern, withIndex):
+    '''makes sure a worker process has the dataset (forked workers have
+already inherited it; others load it, from the snapshot if cached)'''
+    if _cliData is None:
+        _loadCliData(filename, cache, intern, withIndex)
+
+def _runCliQuery(line):
+    '''parses and runs one line of a queries file against the loaded
+dataset, returning (name, seconds taken, 'result' or 'error', value);
+a line that isn't a valid request is reported as an error like any
+other, with name None if it doesn't get as far as naming a query'''
+    name = None
+    start = time.perf_counter()
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("Query must be a JSON object")
+        name = request.get('query')
+        args = request.get('args', [])
+        kwargs = request.get('kwargs', {})
+        if not isinstance(args, list) or not isinstance(kwargs, dict):
+            raise ValueError("Query args must be a list and kwargs an object")
+        if name == 'loadData':
+            value = loadData(*args, **kwargs)
+        else:
+            yelpDict, index = _cliData
+            value = runQuery(yelpDict, name, args, kwargs, index)
+        kind = 'result'
+    except Exception as e:
+        value = f'{type(e).__name__}: {e}'
+        kind = 'error'
+    return name, time.perf_counter() - start, kind, value
+
+def _readQueries(filename):
+    '''yields the request lines in a queries file, which should each hold
+one JSON object like {"query": "findCategories", "args": [50]} (they
+are parsed by _runCliQuery); blank lines and lines starting with '#'
+are skipped'''
+    with open(filename, 'r') as f:
+        for line in f:
+            if line.strip() and not line.lstrip().startswith('#'):
+                yield line
+
+def _cliOutputName(number, name):
+    '''returns the filename main writes a query's result to, using
+'invalid' for any name that could not be a query (and so might not be
+safe in a path)'''
+    if not isinstance(name, str) or not name.isidentifier():
+        name = 'invalid'
+    return f'{number:04d}-{name}.json'
+
+def main(argv=None):
+    '''loads a dataset once and then runs every query in a queries file
+against it; see --help'''
+    parser = argparse.ArgumentParser(
+        description=(
+            "Load a Yelp dataset once and run a file of queries against"
+            " it. Each line of the queries file is a JSON object naming a"
+            " function (loadData or one of: " + ', '.join(QUERIES) + ")"
+            " and its arguments after yelpDict, e.g."
+            ' {"query": "findCategories", "args": [50]}.'
+        )
+    )
+    parser.add_argument('data', help='Yelp JSON file to load')
+    parser.add_argument('queries', help='file of queries, one per line')
+    parser.add_argument(
+        '--out-dir',
+        help='write each result to its own file here instead of stdout'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='number of processes to run queries in'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='report time spent in each stage on stderr'
+    )
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        help='use (and keep) a binary snapshot of the data file'
+    )
+    parser.add_argument(
+        '--intern',
+        action='store_true',
+        help='share repeated city, state and category strings'
+    )
+    parser.add_argument(
+        '--no-index',
+        action='store_true',
+        help="don't build a YelpIndex (faster to start for few queries)"
+    )
+    options = parser.parse_args(argv)
+
+    def report(stage, seconds):
+        '''prints how long a stage took if profiling'''
+        if options.profile:
+            print(f"[profile] {stage}: {seconds:.4f}s", file=sys.stderr)
+
+    start = time.perf_counter()
+    dataArgs = (options.data, options.cache, options.intern,
+                not options.no_index)
+    _loadCliData(*dataArgs)
+    report('load', time.perf_counter() - start)
+    requests = list(_readQueries(options.queries))
+    if options.out_dir is not None:
+        os.makedirs(options.out_dir, exist_ok=True)
+
+    if options.workers > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=options.workers,
+            initializer=_initCliWorker,
+            initargs=dataArgs
+        )
+        outcomes = pool.map(_runCliQuery, requests)
+    else:
+        pool = None
+        outcomes = map(_runCliQuery, requests)
+
+    failures = 0
+    queryStart = time.perf_counter()
+    try:
+        for number, (name, seconds, kind, value) in enumerate(outcomes):
+            report(f'query {number} ({name})', seconds)
+            failures += kind == 'error'
+            writeStart = time.perf_counter()
+            if options.out_dir is not None:
+                outFilename = os.path.join(
+                    options.out_dir,
+                    _cliOutputName(number, name)
+                )
+                with open(outFilename, 'w') as f:
+                    json.dump({kind: value}, f, default=_jsonDefault)
+            else:
+                record = {'query': name, kind: value}
+                print(json.dumps(record, default=_jsonDefault), flush=True)
+            report(f'write {number}', time.perf_counter() - writeStart)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    report('all queries', time.perf_counter() - queryStart)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
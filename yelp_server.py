@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+Consulted:
+Date: 2026.10.18
+Purpose: A long-lived local query server for the Yelp task functions.
+    The data is loaded (and indexed) once, and then any number of
+    clients can send queries over TCP or a Unix socket and get answers
+    back without paying the loading cost again.
+
+Protocol: each request is one line of JSON such as
+    {"id": 1, "query": "findCategories", "args": [50], "kwargs": {}}
+naming one of the functions in yelp.QUERIES; "args" and "kwargs" are the
+arguments after yelpDict, and "id" is any value the client likes. Each
+response is one line of JSON holding the same "id" plus either a
+"result" or an "error" message. Responses on a connection may arrive in
+a different order from the requests.
+
+findBusinesses writes a file, so it is only answered by a server started
+with --out-dir, and its outFilename must then be a relative path naming
+a file inside that directory.
+
+Usage:
+    python yelp_server.py serve DATA.json [--port PORT | --unix PATH]
+                                          [--out-dir DIR]
+    python yelp_server.py bench [--port PORT | --unix PATH]
+"""
+
+#---------#
+# Imports #
+#---------#
+
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yelp
+
+#-----------#
+# Constants #
+#-----------#
+
+DEFAULT_HOST = '127.0.0.1'
+"""
+Address the server listens on (and the benchmark connects to) by
+default; the server is only meant for local use.
+"""
+
+DEFAULT_PORT = 8757
+"""
+TCP port used when no port or Unix socket path is given.
+"""
+
+BATCH_SIZE = 64
+"""
+Most requests the server answers together in one batch.
+"""
+
+BATCH_DELAY = 0.002
+"""
+Seconds the server waits after the first request of a batch for more
+requests to arrive.
+"""
+
+BENCH_QUERIES = [
+    ("getBusinessCount", ["Pizza Hut"]),
+    ("uniqueCities", []),
+    ("selectBusinesses", ["Restaurants", "Las Vegas", 3, 10]),
+    ("findCategories", [50]),
+    ("bestPizzaPlace", []),
+    ("bestInCategory", ["Restaurants"]),
+]
+"""
+The mix of queries the benchmark client sends, round-robin.
+"""
+
+#--------#
+# Server #
+#--------#
+
+class QueryServer:
+    '''answers queries against one loaded Yelp dictionary. Requests from
+every connection go into one queue; they are taken off in batches, and
+each batch is answered in a single call on a dedicated worker thread
+(so the event loop stays free to read and write sockets while queries
+run, and the index and cache are only ever used from one thread).
+Identical queries within a batch are only answered once. Files written
+by findBusinesses are kept inside outDir; without one, findBusinesses is
+refused.'''
+    def __init__(self, yelpDict, outDir=None):
+        self.yelpDict = yelpDict
+        self.outDir = None if outDir is None else os.path.realpath(outDir)
+        self.index = yelp.YelpIndex(yelpDict)
+        self.cache = yelp.QueryCache(self.index)
+        self.batches = 0
+        self._queue = asyncio.Queue()
+        self._worker = ThreadPoolExecutor(max_workers=1)
+
+    def outputPath(self, filename):
+        '''returns where an output file named by a client goes inside
+outDir, raising ValueError for a name that could point anywhere else'''
+        if self.outDir is None:
+            raise ValueError("findBusinesses needs a server started with"
+                             " --out-dir")
+        if (
+            not isinstance(filename, str)
+            or not filename
+            or os.path.isabs(filename)
+            or '..' in pathlib.PurePath(filename).parts
+        ):
+            raise ValueError(f"Output file {filename!r} must be a relative"
+                             " path inside the output directory")
+        path = os.path.realpath(os.path.join(self.outDir, filename))
+        if os.path.commonpath([path, self.outDir]) != self.outDir:
+            raise ValueError(f"Output file {filename!r} is outside the"
+                             " output directory")
+        return path
+
+    def answer(self, name, args, kwargs):
+        '''answers one query, through the cache when it can be cached;
+findBusinesses has its output file confined to outDir'''
+        if name == 'findBusinesses':
+            args = list(args)
+            kwargs = dict(kwargs)
+            if len(args) > 4:
+                args[4] = self.outputPath(args[4])
+            else:
+                kwargs['outFilename'] = self.outputPath(
+                    kwargs.get('outFilename')
+                )
+        if name in yelp.QUERIES and hasattr(self.cache, name):
+            return getattr(self.cache, name)(*args, **kwargs)
+        return yelp.runQuery(self.yelpDict, name, args, kwargs, self.index)
+
+    def answerBatch(self, requests):
+        '''answers a list of (name, args, kwargs) requests, returning a
+('result', value) or ('error', message) pair for each'''
+        answers = {}
+        responses = []
+        for name, args, kwargs in requests:
+            key = json.dumps([name, args, kwargs], sort_keys=True)
+            if key not in answers:
+                try:
+                    answers[key] = ('result', self.answer(name, args, kwargs))
+                except Exception as e:
+                    answers[key] = ('error', f'{type(e).__name__}: {e}')
+            responses.append(answers[key])
+        return responses
+
+    async def submit(self, name, args, kwargs):
+        '''queues one query and waits for its ('result'|'error', value)'''
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((name, args, kwargs, future))
+        return await future
+
+    async def batcher(self):
+        '''takes requests off the queue in batches and answers them'''
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            await asyncio.sleep(BATCH_DELAY)
+            while len(pending) < BATCH_SIZE and not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            requests = [
+                (name, args, kwargs) for name, args, kwargs, _ in pending
+            ]
+            try:
+                responses = await loop.run_in_executor(
+                    self._worker,
+                    self.answerBatch,
+                    requests
+                )
+            except Exception as e:
+                failure = ('error', f'{type(e).__name__}: {e}')
+                responses = [failure] * len(pending)
+            self.batches += 1
+            for (*_, future), response in zip(pending, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    async def respond(self, request, writer):
+        '''answers one request line and writes the response line'''
+        try:
+            message = json.loads(request)
+            name = message['query']
+            args = message.get('args', [])
+            kwargs = message.get('kwargs', {})
+            response = {'id': message.get('id')}
+        except (ValueError, KeyError, TypeError) as e:
+            response = {'id': None, 'error': f'Bad request: {e}'}
+        else:
+            kind, value = await self.submit(name, args, kwargs)
+            response[kind] = value
+        writer.write(json.dumps(response).encode('utf-8') + b'\n')
+        await writer.drain()
+
+    async def handleClient(self, reader, writer):
+        '''reads requests from one connection until it closes'''
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.create_task(self.respond(line, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                    unixPath=None, ready=None):
+        '''serves forever on a TCP port or, if given, a Unix socket path;
+ready (an asyncio.Event) is set once connections are being accepted'''
+        if unixPath is not None:
+            server = await asyncio.start_unix_server(
+                self.handleClient,
+                unixPath
+            )
+        else:
+            server = await asyncio.start_server(self.handleClient, host, port)
+        batcher = asyncio.create_task(self.batcher())
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._worker.shutdown(wait=False)
+
+#--------#
+# Client #
+#--------#
+
+async def connect(host=DEFAULT_HOST, port=DEFAULT_PORT, unixPath=None):
+    '''opens a connection to a running server'''
+    if unixPath is not None:
+        return await asyncio.open_unix_connection(unixPath)
+    return await asyncio.open_connection(host, port)
+
+async def query(reader, writer, name, *args, **kwargs):
+    '''sends one query over an open connection and returns its result,
+raising RuntimeError if the server reports an error; only use this when
+nothing else is waiting for responses on the same connection'''
+    request = {'id': 0, 'query': name, 'args': args, 'kwargs': kwargs}
+    writer.write(json.dumps(request).encode('utf-8') + b'\n')
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    if 'error' in response:
+        raise RuntimeError(response['error'])
+    return response['result']
+
+async def bench(requests=2000, concurrency=16, host=DEFAULT_HOST,
+                port=DEFAULT_PORT, unixPath=None):
+    '''sends requests queries from concurrency simultaneous connections
+and prints throughput and latency percentiles'''
+    latencies = []
+
+    async def client(number):
+        '''one connection sending its share of the queries in turn'''
+        reader, writer = await connect(host, port, unixPath)
+        for i in range(number, requests, concurrency):
+            name, args = BENCH_QUERIES[i % len(BENCH_QUERIES)]
+            start = time.perf_counter()
+            await query(reader, writer, name, *args)
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+        await writer.wait_closed()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        '''returns the pth percentile latency in milliseconds'''
+        position = min(len(latencies) - 1, int(len(latencies) * p))
+        return latencies[position] * 1000
+
+    print(f"{len(latencies)} requests from {concurrency} connections"
+          f" in {elapsed:.3f}s ({len(latencies) / elapsed:.0f} requests/s)")
+    print(f"latency ms: p50 {percentile(0.5):.3f}"
+          f"  p95 {percentile(0.95):.3f}  p99 {percentile(0.99):.3f}")
+
+#--------------#
+# Command line #
+#--------------#
+
+def main(argv=None):
+    '''runs the server or the benchmark client from the command line'''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    serveParser = commands.add_parser('serve', help='load data and serve it')
+    serveParser.add_argument('data', help='Yelp JSON file to load')
+    serveParser.add_argument(
+        '--cache',
+        action='store_true',
+        help='use (and keep) a binary snapshot of the data file'
+    )
+    serveParser.add_argument(
+        '--out-dir',
+        help='directory findBusinesses may write files in (refused if unset)'
+    )
+    benchParser = commands.add_parser('bench', help='benchmark a server')
+    benchParser.add_argument('--requests', type=int, default=2000)
+    benchParser.add_argument('--concurrency', type=int, default=16)
+    for subparser in (serveParser, benchParser):
+        subparser.add_argument('--host', default=DEFAULT_HOST)
+        subparser.add_argument('--port', type=int, default=DEFAULT_PORT)
+        subparser.add_argument('--unix', help='Unix socket path to use')
+    options = parser.parse_args(argv)
+
+    if options.command == 'serve':
+        server = QueryServer(
+            yelp.loadData(options.data, cache=options.cache),
+            options.out_dir
+        )
+        where = options.unix or f'{options.host}:{options.port}'
+        print(f"Serving {len(server.yelpDict)} businesses on {where}",
+              file=sys.stderr)
+        try:
+            asyncio.run(server.serve(options.host, options.port, options.unix))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(bench(
+            options.requests,
+            options.concurrency,
+            options.host,
+            options.port,
+            options.unix
+        ))
+
+if __name__ == '__main__':
+    main()